@@ -0,0 +1,94 @@
+"""
+Recall@1 and latency of ANN gallery search against exact search
+
+Usage (from backend/):
+    python -m benchmarks.ann_recall --sizes 20000 100000 --queries 1000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from services.gallery_service import EMBEDDING_DIM, FaceGallery, normalize_embeddings
+
+
+def synthetic_students(count: int, rng: np.random.Generator):
+    """Random unit embeddings standing in for enrolled students"""
+    embeddings = normalize_embeddings(rng.standard_normal((count, EMBEDDING_DIM)))
+    return [
+        {"id": i, "name": f"student_{i}", "embedding": embeddings[i]}
+        for i in range(count)
+    ], embeddings
+
+
+def noisy_queries(embeddings: np.ndarray, count: int, rng: np.random.Generator):
+    """Re-captures of enrolled faces at roughly 0.7 cosine similarity"""
+    picks = rng.integers(0, len(embeddings), count)
+    noise = normalize_embeddings(rng.standard_normal((count, EMBEDDING_DIM)))
+    return normalize_embeddings(embeddings[picks] + noise)
+
+
+def time_single_queries(gallery: FaceGallery, queries: np.ndarray):
+    """Per-query latency in ms, one face at a time like mark-secure"""
+    ids = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        match_ids, _, _ = gallery.match(query, k=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append(match_ids[0, 0])
+    return np.array(ids, dtype=object), np.array(latencies)
+
+
+def run(size: int, num_queries: int, args, rng: np.random.Generator):
+    students, embeddings = synthetic_students(size, rng)
+    queries = noisy_queries(embeddings, num_queries, rng)
+
+    exact = FaceGallery()
+    exact.load(students)
+
+    ann = FaceGallery(
+        ann_backend=args.backend,
+        ann_min_size=0,
+        ann_params={
+            "m": args.m,
+            "ef_construction": args.ef_construction,
+            "ef_search": args.ef_search,
+        },
+    )
+    start = time.perf_counter()
+    ann.load(students)
+    build_seconds = time.perf_counter() - start
+
+    exact_ids, exact_ms = time_single_queries(exact, queries)
+    ann_ids, ann_ms = time_single_queries(ann, queries)
+    recall = float(np.mean(exact_ids == ann_ids))
+
+    print(
+        f"{size:>9} | exact p50 {np.percentile(exact_ms, 50):7.3f} ms"
+        f"  p99 {np.percentile(exact_ms, 99):7.3f} ms"
+        f" | {args.backend} p50 {np.percentile(ann_ms, 50):7.3f} ms"
+        f"  p99 {np.percentile(ann_ms, 99):7.3f} ms"
+        f" | recall@1 {recall:.4f} | build {build_seconds:6.1f} s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--backend", default="hnsw")
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for size in args.sizes:
+        run(size, args.queries, args, rng)
+
+
+if __name__ == "__main__":
+    main()
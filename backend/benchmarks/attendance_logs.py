@@ -0,0 +1,205 @@
+"""
+Daily attendance query and logging cost, before and after log_date
+
+Builds two scratch copies of attendance_logs with --rows rows (one per
+student per day): "old" as before migration 007 (student_id index only)
+and "new" with log_date, the (student_id, log_date) unique constraint and
+the (log_date, log_time) covering index. Times the /attendance/today
+filter on both, then logging --sightings camera sightings as
+SELECT-then-UPDATE/INSERT per sighting versus one multi-row upsert.
+
+Usage (from backend/):
+    python -m benchmarks.attendance_logs --rows 10000000 --students 20000
+"""
+
+import argparse
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+from config import settings
+
+TABLES = {
+    "old": """
+        CREATE UNLOGGED TABLE bench_logs_old (
+            id BIGSERIAL PRIMARY KEY,
+            student_id UUID NOT NULL,
+            status TEXT,
+            log_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """,
+    "new": """
+        CREATE UNLOGGED TABLE bench_logs_new (
+            id BIGSERIAL PRIMARY KEY,
+            student_id UUID NOT NULL,
+            status TEXT,
+            log_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            log_date DATE NOT NULL
+        );
+    """,
+}
+
+INDEXES = {
+    "old": ["CREATE INDEX ON bench_logs_old(student_id)"],
+    "new": [
+        "ALTER TABLE bench_logs_new ADD CONSTRAINT bench_logs_new_student_day"
+        " UNIQUE (student_id, log_date)",
+        "CREATE INDEX ON bench_logs_new(log_date, log_time)"
+        " INCLUDE (student_id, status)",
+    ],
+}
+
+TODAY_SQL = {
+    "old": "SELECT student_id, status, log_time FROM bench_logs_old"
+    " WHERE log_time::date = CURRENT_DATE ORDER BY log_time DESC",
+    "new": "SELECT student_id, status, log_time FROM bench_logs_new"
+    " WHERE log_date = CURRENT_DATE ORDER BY log_time DESC",
+}
+
+
+def build(cur, rows: int, students: int):
+    days = max(1, rows // students)
+    for name in ("old", "new"):
+        cur.execute(f"DROP TABLE IF EXISTS bench_logs_{name}")
+        cur.execute(TABLES[name])
+        date_column = ", log_date" if name == "new" else ""
+        date_value = ", (CURRENT_DATE - d)" if name == "new" else ""
+        # Student s's uuid is derived from s so both tables share ids
+        cur.execute(
+            f"""
+            INSERT INTO bench_logs_{name}
+                (student_id, status, log_time{date_column})
+            SELECT md5(s::text)::uuid, 'Present',
+                   (CURRENT_DATE - d) + interval '8 hours'
+                       + (s %% 600) * interval '1 second'
+                   {date_value}
+            FROM generate_series(0, %s) d, generate_series(1, %s) s
+        """,
+            (days - 1, students),
+        )
+        for statement in INDEXES[name]:
+            cur.execute(statement)
+        cur.execute(f"VACUUM ANALYZE bench_logs_{name}")
+    return days * students
+
+
+def time_query(cur, sql: str, repeat: int):
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql)
+    plan = [row[0] for row in cur.fetchall()]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cur.execute(sql)
+        cur.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return plan, np.array(timings)
+
+
+def log_one_by_one(conn, sightings):
+    """The pre-007 log_attendance pattern: check, then update or insert"""
+    cur = conn.cursor()
+    for student_id, seen in sightings:
+        cur.execute(
+            "SELECT id FROM bench_logs_old WHERE student_id = %s"
+            " AND log_time::date = %s",
+            (student_id, seen.date()),
+        )
+        existing = cur.fetchone()
+        if existing:
+            cur.execute(
+                "UPDATE bench_logs_old SET log_time = %s WHERE id = %s",
+                (seen, existing[0]),
+            )
+        else:
+            cur.execute(
+                "INSERT INTO bench_logs_old (student_id, status, log_time)"
+                " VALUES (%s, 'Present', %s)",
+                (student_id, seen),
+            )
+        conn.commit()
+    cur.close()
+
+
+def log_upsert(conn, sightings):
+    """AttendanceWriter's flush: one multi-row INSERT ... ON CONFLICT"""
+    latest = {}
+    for student_id, seen in sightings:
+        latest[student_id] = max(seen, latest.get(student_id, seen))
+    cur = conn.cursor()
+    execute_values(
+        cur,
+        """
+        INSERT INTO bench_logs_new (student_id, status, log_time, log_date)
+        VALUES %s
+        ON CONFLICT (student_id, log_date)
+        DO UPDATE SET log_time = GREATEST(bench_logs_new.log_time, EXCLUDED.log_time)
+    """,
+        [(sid, seen, seen.date()) for sid, seen in latest.items()],
+        template="(%s::uuid, 'Present', %s, %s)",
+        page_size=len(latest),
+    )
+    conn.commit()
+    cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--students", type=int, default=20_000)
+    parser.add_argument("--sightings", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="Keep scratch tables")
+    args = parser.parse_args()
+
+    # Not dependencies.get_db_connection: that module loads the face models
+    conn = psycopg2.connect(
+        host=settings.DB_HOST,
+        database=settings.DB_NAME,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+    )
+    conn.autocommit = True
+    cur = conn.cursor()
+
+    start = time.perf_counter()
+    total = build(cur, args.rows, args.students)
+    print(f"Built 2 x {total:,} rows in {time.perf_counter() - start:.0f}s")
+
+    for name, sql in TODAY_SQL.items():
+        plan, timings = time_query(cur, sql, args.repeat)
+        print(
+            f"today ({name}) | p50 {np.percentile(timings, 50):8.2f} ms"
+            f"  p99 {np.percentile(timings, 99):8.2f} ms"
+        )
+        for line in plan:
+            print(f"    {line}")
+
+    # A classroom's sightings: 40 students seen again and again today
+    rng = np.random.default_rng(0)
+    classroom = [str(uuid.UUID(bytes=rng.bytes(16))) for _ in range(40)]
+    now = datetime.now()
+    sightings = [(classroom[i % 40], now) for i in range(args.sightings)]
+
+    conn.autocommit = False
+    for label, log in (("select+write", log_one_by_one), ("upsert", log_upsert)):
+        start = time.perf_counter()
+        log(conn, sightings)
+        seconds = time.perf_counter() - start
+        print(
+            f"log {args.sightings} sightings ({label}) | {seconds * 1000:8.1f} ms"
+            f" | {args.sightings / seconds:10.0f} sightings/s"
+        )
+
+    if not args.keep:
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute("DROP TABLE bench_logs_old, bench_logs_new")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Per-request connection cost: connect-per-request against pooled drivers
+
+Every variant runs the same indexed student lookup per request:
+"connect" opens and closes a psycopg2 connection each time (the old
+get_db_connection), "psycopg2-pool" goes through utils.db_pool as the
+handlers do, and, when installed, "psycopg-pool" (psycopg 3) and
+"asyncpg" run their own pools, asyncpg on one event loop instead of
+threads. The pool sizes match DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE.
+
+Usage (from backend/):
+    python -m benchmarks.db_pool --concurrency 1 16 64 --requests 5000
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import psycopg2
+
+from config import settings
+from dependencies import DB_CONNECT_KWARGS
+from utils.db_pool import ConnectionPool
+
+try:
+    import psycopg_pool
+except ImportError:
+    psycopg_pool = None
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+LOOKUP_SQL = "SELECT id, name FROM students WHERE id = %s"
+
+
+def lookup(conn, student_id):
+    cur = conn.cursor()
+    cur.execute(LOOKUP_SQL, (student_id,))
+    cur.fetchone()
+    cur.close()
+
+
+def run_threads(query, student_ids, requests, concurrency):
+    def one(i):
+        start = time.perf_counter()
+        query(student_ids[i % len(student_ids)])
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = np.array(list(executor.map(one, range(requests))))
+    return latencies, time.perf_counter() - start
+
+
+def bench_connect(student_ids, requests, concurrency):
+    def query(student_id):
+        conn = psycopg2.connect(**DB_CONNECT_KWARGS)
+        lookup(conn, student_id)
+        conn.close()
+
+    return run_threads(query, student_ids, requests, concurrency)
+
+
+def bench_psycopg2_pool(student_ids, requests, concurrency):
+    pool = ConnectionPool(
+        DB_CONNECT_KWARGS,
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        acquire_timeout=60,
+    )
+    pool.open()
+
+    def query(student_id):
+        conn = pool.acquire()
+        lookup(conn, student_id)
+        conn.close()
+
+    try:
+        return run_threads(query, student_ids, requests, concurrency)
+    finally:
+        pool.close()
+
+
+def bench_psycopg_pool(student_ids, requests, concurrency):
+    conninfo = " ".join(
+        f"{key}={value}"
+        for key, value in (
+            ("host", settings.DB_HOST),
+            ("dbname", settings.DB_NAME),
+            ("user", settings.DB_USER),
+            ("password", settings.DB_PASSWORD),
+        )
+        if value
+    )
+    pool = psycopg_pool.ConnectionPool(
+        conninfo,
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        timeout=60,
+        open=True,
+    )
+    pool.wait()
+
+    def query(student_id):
+        with pool.connection() as conn:
+            lookup(conn, student_id)
+
+    try:
+        return run_threads(query, student_ids, requests, concurrency)
+    finally:
+        pool.close()
+
+
+def bench_asyncpg(student_ids, requests, concurrency):
+    sql = LOOKUP_SQL.replace("%s", "$1")
+
+    async def main():
+        pool = await asyncpg.create_pool(
+            host=settings.DB_HOST,
+            database=settings.DB_NAME,
+            user=settings.DB_USER,
+            password=settings.DB_PASSWORD or None,
+            min_size=settings.DB_POOL_MIN_SIZE,
+            max_size=settings.DB_POOL_MAX_SIZE,
+        )
+        latencies = []
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                start = time.perf_counter()
+                async with pool.acquire() as conn:
+                    await conn.fetchrow(sql, student_ids[i % len(student_ids)])
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        seconds = time.perf_counter() - start
+        await pool.close()
+        return np.array(latencies), seconds
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONNECT_KWARGS)
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM students LIMIT 1000")
+    student_ids = [row[0] for row in cur.fetchall()]
+    conn.close()
+    if not student_ids:
+        raise SystemExit("❌ Needs enrolled students")
+
+    variants = [("connect", bench_connect), ("psycopg2-pool", bench_psycopg2_pool)]
+    if psycopg_pool is not None:
+        variants.append(("psycopg-pool", bench_psycopg_pool))
+    else:
+        print("⚠️ psycopg_pool not installed, skipping psycopg-pool")
+    if asyncpg is not None:
+        variants.append(("asyncpg", bench_asyncpg))
+    else:
+        print("⚠️ asyncpg not installed, skipping asyncpg")
+
+    for concurrency in args.concurrency:
+        for label, bench in variants:
+            latencies, seconds = bench(student_ids, args.requests, concurrency)
+            print(
+                f"{concurrency:>3} concurrent | {label:>13}"
+                f" | {args.requests / seconds:7.1f} req/s"
+                f" | p50 {np.percentile(latencies, 50):7.2f} ms"
+                f"  p99 {np.percentile(latencies, 99):7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Per-face latency and resident memory of full vs trimmed model packs
+
+Each configuration loads in a fresh process so RSS figures don't mix.
+
+Usage (from backend/):
+    python -m benchmarks.face_pipeline --image ../ml_service/test.jpg
+"""
+
+import argparse
+import multiprocessing
+import time
+
+import cv2
+import numpy as np
+
+from config import settings
+
+CONFIGS = {
+    "full pack": None,
+    "det+rec": ["detection", "recognition"],
+}
+
+
+def resident_mib() -> float:
+    """Current RSS of this process"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def measure(modules, image_path: str, repeat: int, results):
+    from services.face_engine import create_face_app
+
+    app = create_face_app(
+        settings.FACE_MODEL,
+        settings.DETECTION_SIZE,
+        ["CPUExecutionProvider"],
+        ctx_id=-1,
+        modules=modules,
+    )
+    img = cv2.imread(image_path)
+    faces = len(app.get(img))  # warm-up
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        app.get(img)
+        latencies.append((time.perf_counter() - start) * 1000 / max(faces, 1))
+
+    results.put((sorted(app.models), faces, np.array(latencies), resident_mib()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--image", default="../ml_service/test.jpg")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    for label, modules in CONFIGS.items():
+        results = context.Queue()
+        process = context.Process(
+            target=measure, args=(modules, args.image, args.repeat, results)
+        )
+        process.start()
+        loaded, faces, latencies, rss = results.get()
+        process.join()
+
+        print(
+            f"{label:>9} | {faces} faces | per face p50"
+            f" {np.percentile(latencies, 50):6.1f} ms"
+            f"  p99 {np.percentile(latencies, 99):6.1f} ms"
+            f" | RSS {rss:7.1f} MiB | {', '.join(loaded)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Memory, accuracy and latency of float32 / float16 / int8 gallery matching
+
+Accuracy is top-1 agreement with float32 exact search, with and without
+float32 re-ranking of the compact candidates. Memory is reported twice:
+everything the gallery holds (the float32 rows stay for re-ranking, so the
+compact modes hold more than float32 alone), and what stays private per
+worker when the float32 base is the shared memory-mapped snapshot, the
+only setup in which the compact modes save RAM.
+
+Usage (from backend/):
+    python -m benchmarks.gallery_precision --size 100000 --queries 500
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.ann_recall import noisy_queries, synthetic_students
+from services.gallery_service import GALLERY_PRECISIONS, FaceGallery
+
+
+def build(precision: str, students, rerank_candidates: int) -> FaceGallery:
+    gallery = FaceGallery(precision=precision, rerank_candidates=rerank_candidates)
+    gallery.load(students)
+    return gallery
+
+
+def resident_bytes(gallery: FaceGallery) -> int:
+    """Everything held: float32 base + tail, plus compact codes + scales"""
+    state = gallery._state
+    return (
+        state.base.nbytes
+        + state.tail.nbytes
+        + state.codes.nbytes
+        + state.scales.nbytes
+    )
+
+
+def private_bytes(gallery: FaceGallery) -> int:
+    """Per-worker bytes when the base is a shared memory-mapped snapshot"""
+    return resident_bytes(gallery) - gallery._state.base.nbytes
+
+
+def top1(gallery: FaceGallery, queries: np.ndarray):
+    ids = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        match_ids, _, _ = gallery.match(query, k=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append(match_ids[0, 0])
+    return np.array(ids, dtype=object), np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--rerank", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    students, embeddings = synthetic_students(args.size, rng)
+    queries = noisy_queries(embeddings, args.queries, rng)
+
+    reference, _ = top1(build("float32", students, args.rerank), queries)
+
+    print(f"gallery {args.size} x {embeddings.shape[1]}, {args.queries} queries")
+    for precision in GALLERY_PRECISIONS:
+        for rerank in ([args.rerank] if precision == "float32" else [1, args.rerank]):
+            gallery = build(precision, students, rerank)
+            ids, latencies = top1(gallery, queries)
+            label = precision if precision == "float32" else f"{precision}/rr{rerank}"
+            print(
+                f"{label:>13} | {resident_bytes(gallery) / 2**20:8.1f} MiB resident"
+                f" | {private_bytes(gallery) / 2**20:8.1f} MiB private w/ mmap base"
+                f" | top-1 agreement {np.mean(ids == reference):.4f}"
+                f" | p50 {np.percentile(latencies, 50):6.2f} ms"
+                f"  p99 {np.percentile(latencies, 99):6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Throughput and latency of micro-batched selfie recognition
+
+Simulates an attendance rush: --concurrency clients each send selfies
+back to back through InferenceExecutor.detect_face, for every max batch
+size given.
+
+Usage (from backend/):
+    python -m benchmarks.inference_batching --batch-sizes 1 8 32 \
+        --image ../ml_service/test.jpg --requests 512 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import base64
+import time
+
+import numpy as np
+
+from config import settings
+from services.inference_service import InferenceExecutor
+
+
+async def rush(
+    executor: InferenceExecutor, image_data: str, requests: int, clients: int
+):
+    """Per-request latencies in ms and total wall time in s"""
+    latencies = []
+    remaining = [requests]
+
+    async def client():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            success, _, error = await executor.detect_face(image_data)
+            if not success:
+                raise RuntimeError(error)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(clients)])
+    return np.array(latencies), time.perf_counter() - start
+
+
+async def run(args):
+    with open(args.image, "rb") as f:
+        image_data = "data:image/jpeg;base64," + base64.b64encode(f.read()).decode()
+
+    print(
+        f"{args.requests} requests, {args.concurrency} concurrent, "
+        f"{args.workers} workers, wait {args.max_wait_ms} ms"
+    )
+    for max_batch in args.batch_sizes:
+        executor = InferenceExecutor(
+            settings.FACE_MODEL,
+            settings.SELFIE_DETECTION_SIZE,
+            ["CPUExecutionProvider"],
+            workers=args.workers,
+            intra_op_threads=args.intra_op_threads,
+            max_pending=args.requests,
+            max_batch=max_batch,
+            max_wait_ms=args.max_wait_ms,
+            decode_min_side=settings.SELFIE_DECODE_MIN_SIDE,
+        )
+        executor.start()
+        await rush(executor, image_data, args.workers * 4, args.concurrency)  # warm-up
+        latencies, seconds = await rush(
+            executor, image_data, args.requests, args.concurrency
+        )
+        executor.shutdown()
+
+        print(
+            f"batch {max_batch:>3} | {len(latencies) / seconds:7.1f} req/s"
+            f" | p50 {np.percentile(latencies, 50):7.1f} ms"
+            f"  p99 {np.percentile(latencies, 99):7.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--image", default="../ml_service/test.jpg")
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=settings.INFERENCE_WORKERS)
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
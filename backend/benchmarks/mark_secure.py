@@ -0,0 +1,159 @@
+"""
+A/B latency of mark-secure's database work under concurrent load
+
+"before": one connection held through session SELECT, duplicate-check
+SELECT, INSERT and COMMIT (the pre-change path). "after": session SELECT
+on its own connection, then MARK_SECURE_SQL as a single autocommit
+statement. Face inference is identical on both paths and left out.
+Runs against a scratch session over existing students, deleted at the end.
+
+Usage (from backend/):
+    python -m benchmarks.mark_secure --concurrency 1 16 64 --requests 2000
+"""
+
+import argparse
+import json
+import random
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from dependencies import get_db_connection
+from routers.attendance import MARK_SECURE_SQL
+
+SESSION_SQL = """
+    SELECT id, otp, course_name, classroom_lat, classroom_lon,
+           geofence_radius, allowed_wifi_ssid, expires_at, is_active
+    FROM attendance_sessions
+    WHERE id = %s AND otp = %s AND is_active = TRUE AND expires_at > NOW()
+"""
+
+PAYLOAD = json.dumps({"total_score": 100})
+
+
+def mark_before(session_id, otp, student_id):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(SESSION_SQL, (session_id, otp))
+    cur.fetchone()
+    cur.execute(
+        "SELECT id FROM session_attendance WHERE session_id = %s AND student_id = %s",
+        (session_id, student_id),
+    )
+    if cur.fetchone() is None:
+        cur.execute(
+            """
+            INSERT INTO session_attendance
+            (session_id, student_id, marked_at, device_info, location_data,
+             verification_scores, liveness_data, verification_method)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+            (
+                session_id,
+                student_id,
+                datetime.now(),
+                PAYLOAD,
+                PAYLOAD,
+                PAYLOAD,
+                None,
+                "gps",
+            ),
+        )
+        conn.commit()
+    cur.close()
+    conn.close()
+
+
+def mark_after(session_id, otp, student_id):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(SESSION_SQL, (session_id, otp))
+    cur.fetchone()
+    cur.close()
+    conn.close()
+
+    conn = get_db_connection()
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(
+        MARK_SECURE_SQL,
+        {
+            "session_id": session_id,
+            "otp": otp,
+            "student_id": student_id,
+            "marked_at": datetime.now(),
+            "device_info": PAYLOAD,
+            "location_data": PAYLOAD,
+            "verification_scores": PAYLOAD,
+            "liveness_data": None,
+            "verification_method": "gps",
+        },
+    )
+    cur.fetchone()
+    cur.close()
+    conn.close()
+
+
+def run(mark, session_id, otp, student_ids, requests, concurrency):
+    def one(i):
+        start = time.perf_counter()
+        mark(session_id, otp, student_ids[i % len(student_ids)])
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(one, range(requests))))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM students LIMIT 1000")
+    student_ids = [str(row[0]) for row in cur.fetchall()]
+    if not student_ids:
+        raise SystemExit("❌ Needs enrolled students")
+    otp = "".join(random.choices(string.digits, k=6))
+    cur.execute(
+        """
+        INSERT INTO attendance_sessions
+        (otp, qr_token, course_name, professor_name, expires_at)
+        VALUES (%s, 'bench', 'bench', 'bench', NOW() + INTERVAL '1 hour')
+        RETURNING id
+    """,
+        (otp,),
+    )
+    session_id = str(cur.fetchone()[0])
+
+    try:
+        for concurrency in args.concurrency:
+            for label, mark in (("before", mark_before), ("after", mark_after)):
+                cur.execute(
+                    "DELETE FROM session_attendance WHERE session_id = %s",
+                    (session_id,),
+                )
+                latencies, seconds = run(
+                    mark, session_id, otp, student_ids, args.requests, concurrency
+                )
+                print(
+                    f"{concurrency:>3} concurrent | {label:>6}"
+                    f" | {args.requests / seconds:7.1f} req/s"
+                    f" | p50 {np.percentile(latencies, 50):7.2f} ms"
+                    f"  p99 {np.percentile(latencies, 99):7.2f} ms"
+                )
+    finally:
+        cur.execute("DELETE FROM attendance_sessions WHERE id = %s", (session_id,))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
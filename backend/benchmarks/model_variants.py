@@ -0,0 +1,140 @@
+"""
+Accuracy versus latency of fp32 and int8 model packs on the CPU profile
+
+For each face photo, the first detected face is compared between packs:
+detection agreement (same face found, IoU >= 0.5) and the cosine
+similarity between the two packs' embeddings. Latency is per image for
+detection and per face for recognition. Images are labelled by their
+sub-folder (one per person), giving genuine / impostor verification
+accuracy at RECOGNITION_THRESHOLD for each pack.
+
+Usage (from backend/):
+    python -m benchmarks.model_variants --eval-dir data/eval \
+        --models buffalo_l buffalo_l_int8
+"""
+
+import argparse
+import glob
+import itertools
+import os
+import time
+
+import cv2
+import numpy as np
+from insightface.utils import face_align
+
+from config import settings
+from services.face_engine import DEVICE_PROVIDERS, create_face_app
+from services.gallery_service import normalize_embeddings
+
+
+def first_faces(app, images):
+    """First face box + embedding per image, with det/rec latencies in ms"""
+    detector = app.models["detection"]
+    recognizer = app.models["recognition"]
+    boxes, embeddings, det_ms, rec_ms = [], [], [], []
+
+    for img in images:
+        start = time.perf_counter()
+        bboxes, kpss = detector.detect(img, max_num=0, metric="default")
+        det_ms.append((time.perf_counter() - start) * 1000)
+        if bboxes.shape[0] == 0:
+            boxes.append(None)
+            embeddings.append(None)
+            continue
+
+        crop = face_align.norm_crop(
+            img, landmark=kpss[0], image_size=recognizer.input_size[0]
+        )
+        start = time.perf_counter()
+        embedding = recognizer.get_feat([crop])[0]
+        rec_ms.append((time.perf_counter() - start) * 1000)
+        boxes.append(bboxes[0, :4])
+        embeddings.append(normalize_embeddings(embedding)[0])
+
+    return boxes, embeddings, np.array(det_ms), np.array(rec_ms)
+
+
+def iou(a, b) -> float:
+    x1, y1 = np.maximum(a[:2], b[:2])
+    x2, y2 = np.minimum(a[2:], b[2:])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def verification_accuracy(labels, embeddings) -> float:
+    """Share of genuine/impostor pairs classified right at the threshold"""
+    correct = total = 0
+    for (la, ea), (lb, eb) in itertools.combinations(zip(labels, embeddings), 2):
+        if ea is None or eb is None:
+            continue
+        same = float(ea @ eb) >= settings.RECOGNITION_THRESHOLD
+        correct += same == (la == lb)
+        total += 1
+    return correct / total if total else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--eval-dir", required=True)
+    parser.add_argument(
+        "--models", nargs="+", default=["buffalo_l", "buffalo_l_int8"]
+    )
+    parser.add_argument("--det-size", type=int, default=settings.DETECTION_SIZE[0])
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = sorted(
+        path
+        for pattern in ("*.jpg", "*.jpeg", "*.png")
+        for path in glob.glob(
+            os.path.join(args.eval_dir, "**", pattern), recursive=True
+        )
+    )
+    images = [cv2.imread(path) for path in paths]
+    labels = [os.path.basename(os.path.dirname(path)) for path in paths]
+    providers, ctx_id = DEVICE_PROVIDERS["cpu"]
+
+    reference = None
+    print(f"{len(images)} images, det size {args.det_size}")
+    for model in args.models:
+        app = create_face_app(
+            model,
+            (args.det_size, args.det_size),
+            providers,
+            ctx_id,
+            intra_op_threads=args.threads,
+        )
+        first_faces(app, images[:5])  # warm-up
+        boxes, embeddings, det_ms, rec_ms = first_faces(app, images)
+
+        line = (
+            f"{model:>16} | det p50 {np.percentile(det_ms, 50):6.1f} ms"
+            f" p99 {np.percentile(det_ms, 99):6.1f} ms"
+            f" | rec p50 {np.percentile(rec_ms, 50):6.1f} ms"
+            f" p99 {np.percentile(rec_ms, 99):6.1f} ms"
+            f" | verification {verification_accuracy(labels, embeddings):.4f}"
+        )
+        if reference is None:
+            reference = (boxes, embeddings)
+        else:
+            agree = [
+                a is not None and b is not None and iou(a, b) >= 0.5
+                for a, b in zip(reference[0], boxes)
+            ]
+            cosines = [
+                float(a @ b)
+                for a, b, ok in zip(reference[1], embeddings, agree)
+                if ok
+            ]
+            line += (
+                f" | det agreement {np.mean(agree):.4f}"
+                f" | cos vs {args.models[0]} mean {np.mean(cosines):.4f}"
+                f" min {np.min(cosines):.4f}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -9,6 +9,9 @@ class Settings(BaseSettings):
     DB_USER: str = "admin"
     DB_PASSWORD: str = "password123"
     DB_PORT: int = 5432
+    DB_POOL_MIN_SIZE: int = 2  # Connections opened at startup
+    DB_POOL_MAX_SIZE: int = 20  # Per worker; keep workers * this < max_connections
+    DB_POOL_ACQUIRE_TIMEOUT: float = 5.0  # Seconds before a request gets a 503
 
     # ============= MINIO =============
     MINIO_ENDPOINT: str = "localhost:9000"
@@ -19,14 +22,72 @@ class Settings(BaseSettings):
 
     # ============= FACE RECOGNITION =============
     RECOGNITION_THRESHOLD: float = 0.45
-    DETECTION_SIZE: tuple = (640, 640)
-    FACE_MODEL: str = "buffalo_l"
+    DETECTION_SIZE: tuple = (640, 640)  # Classroom camera (wide, many faces)
+    SELFIE_DETECTION_SIZE: tuple = (320, 320)  # Single-face phone selfies
+    SELFIE_DECODE_MIN_SIDE: int = 640  # Selfies decode at 1/2-1/8 down to this
+    FACE_MODEL: str = "buffalo_l"  # "buffalo_l_int8" after scripts/quantize_models.py
+    FACE_MODULES: List[str] = ["detection", "recognition"]  # Model pack subset
+    FACE_FEATURES: List[str] = []  # e.g. ["liveness"] adds landmark models
+    INFERENCE_DEVICE: str = "cpu"  # "cpu" or "cuda" (needs onnxruntime-gpu)
+    INFERENCE_WORKERS: int = 2  # Model processes; 0 = one in-process thread
+    INFERENCE_INTRA_OP_THREADS: int = 0  # Per worker; 0 = cores / workers
+    INFERENCE_INTER_OP_THREADS: int = 1  # > 1 runs graph branches in parallel
+    ONNX_OPTIMIZED_MODEL_DIR: str = "data/onnx_cache"  # "" disables the cache
+    INFERENCE_MAX_PENDING: int = 32  # Queued + running jobs before 503
+    INFERENCE_BATCH_MAX_SIZE: int = 8  # Selfies per recognition call; 1 = off
+    INFERENCE_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # ============= GALLERY SEARCH =============
+    RECOGNITION_BACKEND: str = "memory"  # "memory" or "db" (pgvector in Postgres)
+    PGVECTOR_EF_SEARCH: int = 40
+    ANN_BACKEND: str = ""  # "" = exact search, "hnsw" = hnswlib graph
+    ANN_MIN_GALLERY_SIZE: int = 20000  # Exact search below this size
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    # "int8" + float32 re-rank saves RAM only with a snapshot dir; "float16"
+    # is ~8x slower than float32 on numpy and is kept for comparison only
+    GALLERY_PRECISION: str = "float32"
+    GALLERY_RERANK_CANDIDATES: int = 32
+    TEMPLATE_AGGREGATION: str = "max"  # or "top2_mean" (mean of 2 best templates)
+    MAX_TEMPLATES_PER_STUDENT: int = 5
+    GALLERY_SNAPSHOT_DIR: str = "data/gallery"  # "" disables snapshots
+    GALLERY_SNAPSHOT_MAX_LAG: int = 500  # Changes before a new snapshot
+
+    # ============= CAMERA STREAM =============
+    # camera_id -> device index, video file or rtsp:// URL; the first is the
+    # default for /camera/video_feed
+    CAMERA_SOURCES: Dict[str, str] = {"default": "0"}
+    CAMERA_INFERENCE_WORKERS: int = 2  # Recognition threads shared by all cameras
+    # camera_id -> polygon [[x, y], ...] in fractions of the frame; detection
+    # only looks inside it (e.g. the doorway)
+    CAMERA_ROIS: Dict[str, List[List[float]]] = {}
+    CAMERA_MOTION_THRESHOLD: float = 0.002  # Changed-pixel share; 0 = always detect
+    CAMERA_MOTION_HOLD_FRAMES: int = 15  # Keep detecting after motion stops
+    CAMERA_STREAM_FPS: float = 15.0  # MJPEG output rate, independent of inference
+    CAMERA_JPEG_QUALITY: int = 80
+    CAMERA_VIEWER_QUEUE_SIZE: int = 2  # Frames buffered per viewer before dropping
+    TRACK_IOU_THRESHOLD: float = 0.3  # Box overlap that continues a face track
+    TRACK_MAX_MISSED: int = 10  # Frames a track survives without a detection
+    TRACK_REFRESH_FRAMES: int = 60  # Analysed frames between re-recognitions
+    TRACK_RETRY_FRAMES: int = 5  # Re-recognize unknown / low-score tracks
+    TRACK_CONFIDENT_SCORE: float = 0.55
+
+    ATTENDANCE_FLUSH_SECONDS: float = 2.0  # Camera sightings written in batches
+    ATTENDANCE_MIN_UPDATE_SECONDS: float = 60.0  # Last-seen refresh granularity
+
+    # ============= RECORDED VIDEO =============
+    VIDEO_SAMPLE_FPS: float = 2.0  # Frames analysed per second of video
+    VIDEO_DECODE_WORKERS: int = 4  # Threads decoding + detecting file segments
+    VIDEO_BATCH_SIZE: int = 64  # Faces per recognition call
+    VIDEO_MIN_SIGHTINGS: int = 3  # Matched faces needed to mark a student present
 
     # ============= SESSION MANAGEMENT =============
     OTP_LENGTH: int = 6
     QR_TOKEN_LENGTH: int = 16
     QR_TOKEN_VALIDITY_SECONDS: int = 30
     DEFAULT_SESSION_DURATION_HOURS: int = 2
+    SESSION_CACHE_TTL_SECONDS: float = 30.0  # Check-in session lookups per worker
     MAX_SESSION_DURATION_HOURS: int = 8
     DEFAULT_GEOFENCE_RADIUS_METERS: int = 50
 
@@ -77,6 +138,33 @@ def validate_settings():
     assert (
         settings.RECOGNITION_THRESHOLD > 0 and settings.RECOGNITION_THRESHOLD < 1
     ), "Threshold must be between 0 and 1"
+    assert settings.RECOGNITION_BACKEND in (
+        "memory",
+        "db",
+    ), "RECOGNITION_BACKEND must be 'memory' or 'db'"
+    assert settings.GALLERY_PRECISION in (
+        "float32",
+        "float16",
+        "int8",
+    ), "GALLERY_PRECISION must be 'float32', 'float16' or 'int8'"
+    assert settings.TEMPLATE_AGGREGATION in (
+        "max",
+        "top2_mean",
+    ), "TEMPLATE_AGGREGATION must be 'max' or 'top2_mean'"
+    assert (
+        "detection" in settings.FACE_MODULES and "recognition" in settings.FACE_MODULES
+    ), "FACE_MODULES must include 'detection' and 'recognition'"
+    assert settings.INFERENCE_DEVICE in (
+        "cpu",
+        "cuda",
+    ), "INFERENCE_DEVICE must be 'cpu' or 'cuda'"
+    assert all(
+        len(polygon) >= 3 and all(len(point) == 2 for point in polygon)
+        for polygon in settings.CAMERA_ROIS.values()
+    ), "CAMERA_ROIS polygons need at least 3 [x, y] points"
+    assert (
+        0 <= settings.DB_POOL_MIN_SIZE <= settings.DB_POOL_MAX_SIZE
+    ), "DB_POOL_MIN_SIZE must be between 0 and DB_POOL_MAX_SIZE"
     assert settings.MINIMUM_VERIFICATION_SCORE <= 100, "Score cannot exceed 100"
     assert (
         settings.SCORE_WIFI_MATCH
@@ -1,7 +1,13 @@
 import psycopg2
 from minio import Minio
-from insightface.app import FaceAnalysis
 from config import settings
+from services.face_engine import DEVICE_PROVIDERS, create_face_app, face_modules
+from services.gallery_service import DatabaseGallery, FaceGallery
+from services.inference_service import InferenceExecutor
+from services.roster_service import SessionGalleryCache
+from services.session_cache import SessionCache
+from utils.db_pool import ConnectionPool
+from utils.notifications import NotificationListener
 import threading
 
 # MinIO Client
@@ -12,25 +18,108 @@ minio_client = Minio(
     secure=False,
 )
 
-# Face Analysis App
-face_app = FaceAnalysis(
-    name=settings.FACE_MODEL,
-    providers=["CUDAExecutionProvider", "CPUExecutionProvider"],
+FACE_PROVIDERS, FACE_CTX_ID = DEVICE_PROVIDERS[settings.INFERENCE_DEVICE]
+FACE_MODULES = face_modules(settings.FACE_MODULES, settings.FACE_FEATURES)
+
+# Face Analysis App (camera stream, runs in this process). Built on first
+# use: spawned inference workers re-import the launching script (main.py
+# under `python main.py`) and must not load this model as a side effect
+_face_app = None
+_face_app_lock = threading.Lock()
+
+
+def get_face_app():
+    """Camera-stream face app, loaded on first call"""
+    global _face_app
+    with _face_app_lock:
+        if _face_app is None:
+            _face_app = create_face_app(
+                settings.FACE_MODEL,
+                settings.DETECTION_SIZE,
+                FACE_PROVIDERS,
+                ctx_id=FACE_CTX_ID,
+                modules=FACE_MODULES,
+                inter_op_threads=settings.INFERENCE_INTER_OP_THREADS,
+                optimized_model_dir=settings.ONNX_OPTIMIZED_MODEL_DIR,
+            )
+        return _face_app
+
+
+# Face inference for API requests, in worker processes
+inference_executor = InferenceExecutor(
+    settings.FACE_MODEL,
+    settings.SELFIE_DETECTION_SIZE,
+    FACE_PROVIDERS,
+    ctx_id=FACE_CTX_ID,
+    workers=settings.INFERENCE_WORKERS,
+    intra_op_threads=settings.INFERENCE_INTRA_OP_THREADS,
+    max_pending=settings.INFERENCE_MAX_PENDING,
+    max_batch=settings.INFERENCE_BATCH_MAX_SIZE,
+    max_wait_ms=settings.INFERENCE_BATCH_MAX_WAIT_MS,
+    modules=FACE_MODULES,
+    decode_min_side=settings.SELFIE_DECODE_MIN_SIDE,
+    inter_op_threads=settings.INFERENCE_INTER_OP_THREADS,
+    optimized_model_dir=settings.ONNX_OPTIMIZED_MODEL_DIR,
 )
-face_app.prepare(ctx_id=0, det_size=settings.DETECTION_SIZE)
 
-# Camera State
-camera = None
-camera_lock = threading.Lock()
-stream_active = False
-known_faces = []
+
+DB_CONNECT_KWARGS = dict(
+    host=settings.DB_HOST,
+    database=settings.DB_NAME,
+    user=settings.DB_USER,
+    password=settings.DB_PASSWORD,
+)
+
+
+def connect_db():
+    """Open a dedicated (unpooled) database connection"""
+    return psycopg2.connect(**DB_CONNECT_KWARGS)
+
+
+# Shared by every request of this worker; opened at startup
+db_pool = ConnectionPool(
+    DB_CONNECT_KWARGS,
+    min_size=settings.DB_POOL_MIN_SIZE,
+    max_size=settings.DB_POOL_MAX_SIZE,
+    acquire_timeout=settings.DB_POOL_ACQUIRE_TIMEOUT,
+)
 
 
 def get_db_connection():
-    """Get database connection"""
-    return psycopg2.connect(
-        host=settings.DB_HOST,
-        database=settings.DB_NAME,
-        user=settings.DB_USER,
-        password=settings.DB_PASSWORD,
+    """Get database connection from the pool; close() returns it"""
+    return db_pool.acquire()
+
+
+# Enrolled faces shared by the camera stream and mark-secure
+if settings.RECOGNITION_BACKEND == "db":
+    face_gallery = DatabaseGallery(
+        get_db_connection,
+        ef_search=settings.PGVECTOR_EF_SEARCH,
+        aggregation=settings.TEMPLATE_AGGREGATION,
+        max_templates=settings.MAX_TEMPLATES_PER_STUDENT,
+    )
+else:
+    face_gallery = FaceGallery(
+        ann_backend=settings.ANN_BACKEND or None,
+        ann_min_size=settings.ANN_MIN_GALLERY_SIZE,
+        ann_params={
+            "m": settings.HNSW_M,
+            "ef_construction": settings.HNSW_EF_CONSTRUCTION,
+            "ef_search": settings.HNSW_EF_SEARCH,
+        },
+        precision=settings.GALLERY_PRECISION,
+        rerank_candidates=settings.GALLERY_RERANK_CANDIDATES,
+        aggregation=settings.TEMPLATE_AGGREGATION,
     )
+
+# Roster-scoped candidate galleries for attendance sessions
+session_galleries = SessionGalleryCache(face_gallery, get_db_connection)
+
+# Active sessions looked up by verify-location and mark-secure
+session_cache = SessionCache(
+    get_db_connection, ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS
+)
+
+# LISTEN/NOTIFY connection shared by cross-worker cache sync; held for
+# the process lifetime, so it stays outside the pool
+notification_listener = NotificationListener(connect_db)
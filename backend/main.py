@@ -2,12 +2,32 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime  # ADD THIS
 from config import settings
-from dependencies import known_faces
-from utils.database import load_all_students
+from dependencies import (
+    db_pool,
+    face_gallery,
+    inference_executor,
+    notification_listener,
+    session_cache,
+)
+from services.gallery_sync import (
+    GALLERY_CHANNEL,
+    apply_gallery_change,
+    bootstrap_gallery,
+    resync_gallery,
+)
+from services.session_sync import (
+    SESSION_CHANNEL,
+    apply_session_change,
+    resync_sessions,
+)
+
+from services.attendance_service import attendance_writer
+from services.camera_service import camera_manager
 
 # Import routers
 from routers import camera, students, attendance
 from routers import sessions  # NEW
+from routers import courses
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -28,21 +48,46 @@ app.add_middleware(
 # Startup event
 @app.on_event("startup")
 async def startup_event():
-    """Load known faces on startup"""
-    global known_faces
-    known_faces = load_all_students()
+    """Load known faces and inference workers on startup"""
+    db_pool.open()
+    inference_executor.start()
+    attendance_writer.start()
+    notification_listener.subscribe(SESSION_CHANNEL, apply_session_change)
+    notification_listener.on_resync(resync_sessions)
+    if settings.RECOGNITION_BACKEND == "memory":
+        notification_listener.subscribe(GALLERY_CHANNEL, apply_gallery_change)
+        notification_listener.on_resync(resync_gallery)
+    # Listen before loading so no enrolment falls between the two
+    if not notification_listener.start():
+        print("⚠️ Cache sync listener not connected yet, retrying in background")
+    if settings.RECOGNITION_BACKEND == "memory":
+        try:
+            bootstrap_gallery()
+        except Exception as e:
+            print(f"❌ Gallery load failed: {e}")
     print("🚀 BioAttend Backend Started (v2.0.0 - Session-Based)")
-    print(f"✅ Loaded {len(known_faces)} students")
+    print(f"✅ Loaded {len(face_gallery)} students")
     print(f"🔒 Multi-factor verification enabled")
     print(f"📍 Geofencing: {settings.DEFAULT_GEOFENCE_RADIUS_METERS}m radius")
     print(f"📱 QR refresh: Every {settings.QR_TOKEN_VALIDITY_SECONDS}s")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers"""
+    notification_listener.stop()
+    inference_executor.shutdown()
+    camera_manager.release_all()
+    attendance_writer.stop()
+    db_pool.close()
+
+
 # Include routers
 app.include_router(camera.router)
 app.include_router(students.router)
 app.include_router(attendance.router)
 app.include_router(sessions.router)  # NEW
+app.include_router(courses.router)
 
 
 # Health check
@@ -63,12 +108,14 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "students_loaded": len(known_faces),
+        "students_loaded": len(face_gallery),
+        "db_pool": db_pool.status(),
+        "session_cache": session_cache.status(),
         "active_sessions_count": "N/A",  # TODO: Add session count
     }
 
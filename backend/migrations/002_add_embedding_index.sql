@@ -0,0 +1,24 @@
+-- =====================================================
+-- BioAttend Embedding Index Migration
+-- Adds an HNSW cosine index on students.embedding so
+-- nearest-face lookups stop scanning the whole table
+-- =====================================================
+
+-- 1. Make sure pgvector is available
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- 2. HNSW index for cosine distance (embedding <=> query)
+-- Queries must ORDER BY embedding <=> %s::vector to use it
+CREATE INDEX IF NOT EXISTS idx_students_embedding_hnsw
+ON students USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- 3. Add comments for documentation
+COMMENT ON INDEX idx_students_embedding_hnsw IS 'Approximate cosine search for RECOGNITION_BACKEND=db; tune recall with SET hnsw.ef_search';
+
+-- 4. Success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration completed successfully!';
+    RAISE NOTICE 'Indexes created: idx_students_embedding_hnsw';
+END $$;
@@ -0,0 +1,28 @@
+-- =====================================================
+-- BioAttend Course Roster Migration
+-- Links students to courses so attendance sessions only
+-- match faces against the students enrolled in the course
+-- =====================================================
+
+-- 1. Create course_rosters table
+CREATE TABLE IF NOT EXISTS course_rosters (
+    course_name TEXT NOT NULL,
+    student_id UUID NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (course_name, student_id)
+);
+
+-- 2. Create indexes for performance
+CREATE INDEX IF NOT EXISTS idx_course_rosters_student
+ON course_rosters(student_id);
+
+-- 3. Add comments for documentation
+COMMENT ON TABLE course_rosters IS 'Students enrolled in each course; matched against attendance_sessions.course_name';
+
+-- 4. Success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration completed successfully!';
+    RAISE NOTICE 'Tables created: course_rosters';
+END $$;
@@ -0,0 +1,56 @@
+-- =====================================================
+-- BioAttend Binary Embedding Migration
+-- Stores every embedding as pgvector plus a raw float32
+-- copy so the backend can load the gallery without parsing
+-- =====================================================
+
+-- 1. Convert legacy text embeddings (json / np.str_ repr) to vector(512)
+-- Run 002_add_embedding_index.sql again afterwards if it failed on text
+CREATE EXTENSION IF NOT EXISTS vector;
+
+DO $$
+BEGIN
+    IF (SELECT udt_name FROM information_schema.columns
+        WHERE table_name = 'students' AND column_name = 'embedding') <> 'vector' THEN
+        ALTER TABLE students
+        ALTER COLUMN embedding TYPE vector(512)
+        USING replace(replace(embedding::text, 'np.str_(''', ''), ''')', '')::vector(512);
+    END IF;
+END $$;
+
+-- 2. Add raw float32 column (512 big-endian float4 values, 2048 bytes)
+ALTER TABLE students ADD COLUMN IF NOT EXISTS embedding_f32 BYTEA;
+
+-- 3. Keep embedding_f32 derived from embedding on every write
+CREATE OR REPLACE FUNCTION sync_embedding_f32()
+RETURNS trigger AS $$
+BEGIN
+    IF NEW.embedding IS NULL THEN
+        NEW.embedding_f32 := NULL;
+    ELSE
+        SELECT string_agg(float4send(v), ''::bytea ORDER BY i)
+        INTO NEW.embedding_f32
+        FROM unnest(NEW.embedding::real[]) WITH ORDINALITY AS t(v, i);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_students_embedding_f32 ON students;
+CREATE TRIGGER trg_students_embedding_f32
+BEFORE INSERT OR UPDATE OF embedding ON students
+FOR EACH ROW EXECUTE FUNCTION sync_embedding_f32();
+
+-- 4. Backfill existing rows
+UPDATE students SET embedding = embedding WHERE embedding_f32 IS NULL;
+
+-- 5. Add comments for documentation
+COMMENT ON COLUMN students.embedding_f32 IS 'Big-endian float32 copy of embedding, maintained by trg_students_embedding_f32; read with np.frombuffer(..., ">f4")';
+
+-- 6. Success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration completed successfully!';
+    RAISE NOTICE 'Columns added: students.embedding_f32';
+    RAISE NOTICE 'Triggers created: trg_students_embedding_f32';
+END $$;
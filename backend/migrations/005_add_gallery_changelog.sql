@@ -0,0 +1,48 @@
+-- =====================================================
+-- BioAttend Gallery Changelog Migration
+-- Records every change to enrolled faces with a sequence
+-- number so workers can catch up from a snapshot
+-- =====================================================
+
+-- 1. Create gallery_changes table
+CREATE TABLE IF NOT EXISTS gallery_changes (
+    seq BIGSERIAL PRIMARY KEY,
+    op TEXT NOT NULL,
+    student_id UUID NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT valid_op CHECK (op IN ('add', 'remove'))
+);
+
+-- 2. Log inserts, embedding/name updates and deletes on students
+CREATE OR REPLACE FUNCTION log_gallery_change()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO gallery_changes (op, student_id) VALUES ('remove', OLD.id);
+        RETURN OLD;
+    END IF;
+    INSERT INTO gallery_changes (op, student_id) VALUES ('add', NEW.id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_students_gallery_change ON students;
+CREATE TRIGGER trg_students_gallery_change
+AFTER INSERT OR DELETE OR UPDATE OF embedding, name ON students
+FOR EACH ROW EXECUTE FUNCTION log_gallery_change();
+
+-- 3. Create indexes for performance
+CREATE INDEX IF NOT EXISTS idx_gallery_changes_changed_at
+ON gallery_changes(changed_at);
+
+-- 4. Add comments for documentation
+COMMENT ON TABLE gallery_changes IS 'Append-only log of student gallery changes; seq is the snapshot high-water mark. Rows older than the oldest snapshot can be deleted';
+
+-- 5. Success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration completed successfully!';
+    RAISE NOTICE 'Tables created: gallery_changes';
+    RAISE NOTICE 'Triggers created: trg_students_gallery_change';
+END $$;
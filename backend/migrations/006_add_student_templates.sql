@@ -0,0 +1,87 @@
+-- =====================================================
+-- BioAttend Student Templates Migration
+-- Stores several face embeddings (templates) per student
+-- so recognition tolerates lighting and pose changes
+-- =====================================================
+
+-- 1. Create student_templates table
+CREATE TABLE IF NOT EXISTS student_templates (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    student_id UUID NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+    embedding vector(512) NOT NULL,
+    embedding_f32 BYTEA,
+    is_primary BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 2. Keep embedding_f32 derived from embedding (function from 004)
+DROP TRIGGER IF EXISTS trg_student_templates_embedding_f32 ON student_templates;
+CREATE TRIGGER trg_student_templates_embedding_f32
+BEFORE INSERT OR UPDATE OF embedding ON student_templates
+FOR EACH ROW EXECUTE FUNCTION sync_embedding_f32();
+
+-- 3. Mirror students.embedding as the primary template
+-- Enrolment (API and ml_service scripts) keeps writing students.embedding
+CREATE OR REPLACE FUNCTION sync_primary_template()
+RETURNS trigger AS $$
+BEGIN
+    DELETE FROM student_templates WHERE student_id = NEW.id AND is_primary;
+    IF NEW.embedding IS NOT NULL THEN
+        INSERT INTO student_templates (student_id, embedding, is_primary)
+        VALUES (NEW.id, NEW.embedding, TRUE);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_students_primary_template ON students;
+CREATE TRIGGER trg_students_primary_template
+AFTER INSERT OR UPDATE OF embedding ON students
+FOR EACH ROW EXECUTE FUNCTION sync_primary_template();
+
+-- 4. Log template changes so workers reload the student's templates
+CREATE OR REPLACE FUNCTION log_template_change()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO gallery_changes (op, student_id) VALUES ('add', OLD.student_id);
+    ELSE
+        INSERT INTO gallery_changes (op, student_id) VALUES ('add', NEW.student_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_student_templates_gallery_change ON student_templates;
+CREATE TRIGGER trg_student_templates_gallery_change
+AFTER INSERT OR DELETE OR UPDATE OF embedding ON student_templates
+FOR EACH ROW EXECUTE FUNCTION log_template_change();
+
+-- 5. Backfill one primary template per existing student
+INSERT INTO student_templates (student_id, embedding, is_primary)
+SELECT s.id, s.embedding, TRUE
+FROM students s
+WHERE s.embedding IS NOT NULL
+  AND NOT EXISTS (
+      SELECT 1 FROM student_templates t WHERE t.student_id = s.id AND t.is_primary
+  );
+
+-- 6. Create indexes for performance
+CREATE INDEX IF NOT EXISTS idx_student_templates_student
+ON student_templates(student_id);
+
+CREATE INDEX IF NOT EXISTS idx_student_templates_embedding_hnsw
+ON student_templates USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- 7. Add comments for documentation
+COMMENT ON TABLE student_templates IS 'Face templates per student; the gallery scores all of them and aggregates per student (TEMPLATE_AGGREGATION)';
+COMMENT ON COLUMN student_templates.is_primary IS 'Mirror of students.embedding, maintained by trg_students_primary_template';
+
+-- 8. Success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration completed successfully!';
+    RAISE NOTICE 'Tables created: student_templates';
+    RAISE NOTICE 'Triggers created: trg_student_templates_embedding_f32, trg_students_primary_template, trg_student_templates_gallery_change';
+END $$;
@@ -0,0 +1,63 @@
+-- =====================================================
+-- BioAttend Attendance Log Day Key Migration
+-- Adds a stored log_date so daily lookups are index range
+-- scans and logging is a single INSERT ... ON CONFLICT
+-- =====================================================
+
+-- 1. Add log_date column
+ALTER TABLE attendance_logs ADD COLUMN IF NOT EXISTS log_date DATE;
+
+-- 2. Keep log_date derived from log_time
+CREATE OR REPLACE FUNCTION sync_log_date()
+RETURNS trigger AS $$
+BEGIN
+    NEW.log_date := NEW.log_time::date;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_attendance_logs_log_date ON attendance_logs;
+CREATE TRIGGER trg_attendance_logs_log_date
+BEFORE INSERT OR UPDATE OF log_time ON attendance_logs
+FOR EACH ROW EXECUTE FUNCTION sync_log_date();
+
+-- 3. Backfill existing rows
+UPDATE attendance_logs SET log_date = log_time::date WHERE log_date IS NULL;
+
+-- 4. Collapse duplicate days, keeping the latest sighting
+-- (ml_service logged a row every few minutes)
+DELETE FROM attendance_logs a
+USING attendance_logs b
+WHERE a.student_id = b.student_id
+  AND a.log_date = b.log_date
+  AND (a.log_time, a.id) < (b.log_time, b.id);
+
+ALTER TABLE attendance_logs ALTER COLUMN log_date SET NOT NULL;
+
+-- 5. One row per student per day (the ON CONFLICT target)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'uq_attendance_logs_student_day'
+    ) THEN
+        ALTER TABLE attendance_logs
+        ADD CONSTRAINT uq_attendance_logs_student_day UNIQUE (student_id, log_date);
+    END IF;
+END $$;
+
+-- 6. Create indexes for performance
+-- Covers /attendance/today: range on log_date, ordered by log_time
+CREATE INDEX IF NOT EXISTS idx_attendance_logs_day
+ON attendance_logs(log_date, log_time) INCLUDE (student_id, status);
+
+-- 7. Add comments for documentation
+COMMENT ON COLUMN attendance_logs.log_date IS 'Day of log_time, maintained by trg_attendance_logs_log_date; unique per student';
+
+-- 8. Success message
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration completed successfully!';
+    RAISE NOTICE 'Columns added: attendance_logs.log_date';
+    RAISE NOTICE 'Constraints added: uq_attendance_logs_student_day';
+    RAISE NOTICE 'Indexes created: idx_attendance_logs_day';
+END $$;
@@ -21,6 +21,17 @@ class EnrollResponse(BaseModel):
     student_id: Optional[str] = None
 
 
+class TemplateAddRequest(BaseModel):
+    image: str = Field(..., description="Base64 encoded image")
+
+
+class TemplateResponse(BaseModel):
+    success: bool
+    message: str
+    student_id: Optional[str] = None
+    template_count: int = 0
+
+
 class StudentResponse(BaseModel):
     id: str
     name: str
@@ -34,8 +45,15 @@ class AttendanceLog(BaseModel):
 
 
 class CameraStatusResponse(BaseModel):
+    camera_id: str
+    source: str
     active: bool
-    camera_object_exists: bool
+    stages: Optional[Dict[str, Dict[str, float]]] = None  # fps / frames / dropped
+
+
+class CameraListResponse(BaseModel):
+    cameras: List[CameraStatusResponse]
+    attendance_writer: Optional[Dict[str, float]] = None  # Write-behind queue
 
 
 class DeleteResponse(BaseModel):
@@ -186,3 +204,40 @@ class SessionAttendanceRecord(BaseModel):
 class SessionDetailResponse(BaseModel):
     session: SessionStatusResponse
     attendance_records: List[SessionAttendanceRecord]
+
+
+class VideoSighting(BaseModel):
+    student_id: str
+    name: str
+    sightings: int
+    best_score: float
+    first_seen: float  # Seconds into the video
+    last_seen: float
+
+
+class VideoAttendanceResponse(BaseModel):
+    success: bool
+    session_id: str
+    newly_marked: int
+    students: List[VideoSighting]
+    video_seconds: float
+    frames_sampled: int
+    faces_detected: int
+    processing_seconds: float
+    frames_per_second: float
+    realtime_factor: float  # Video seconds processed per wall-clock second
+
+
+# ==================== COURSE ROSTER MODELS ====================
+
+
+class RosterUpdateRequest(BaseModel):
+    student_ids: List[UUID] = Field(
+        ..., min_length=1, description="Students to add to the course roster"
+    )
+
+
+class RosterResponse(BaseModel):
+    course_name: str
+    total_students: int
+    students: List[StudentResponse]
@@ -1,10 +1,17 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from typing import List
+import asyncio
 from datetime import datetime
 from psycopg2.extras import RealDictCursor
 import json
-from dependencies import get_db_connection, known_faces
+from config import settings
+from dependencies import (
+    get_db_connection,
+    inference_executor,
+    session_cache,
+    session_galleries,
+)
 from models.schemas import (
     AttendanceLog,
     LocationVerificationRequest,
@@ -14,23 +21,64 @@ from models.schemas import (
 )
 from services.export_service import generate_csv_export, generate_excel_export
 from services.location_service import LocationService
-from services.face_service import detect_face_from_base64
-import numpy as np
+from services.inference_service import InferenceBusyError
 
 router = APIRouter(prefix="/attendance", tags=["attendance"])
 
+# mark-secure's write: validates the session, inserts the record and
+# reports a duplicate through an empty RETURNING, all in one statement.
+# Returns one row (session_valid, marked_at); marked_at is NULL when the
+# session is invalid or the student is already marked.
+MARK_SECURE_SQL = """
+    WITH session AS (
+        SELECT id FROM attendance_sessions
+        WHERE id = %(session_id)s AND otp = %(otp)s
+          AND is_active = TRUE AND expires_at > NOW()
+    ),
+    inserted AS (
+        INSERT INTO session_attendance
+        (session_id, student_id, marked_at, device_info, location_data,
+         verification_scores, liveness_data, verification_method)
+        SELECT id, %(student_id)s::uuid, %(marked_at)s, %(device_info)s::jsonb,
+               %(location_data)s::jsonb, %(verification_scores)s::jsonb,
+               %(liveness_data)s::jsonb, %(verification_method)s
+        FROM session
+        ON CONFLICT (session_id, student_id) DO NOTHING
+        RETURNING marked_at
+    )
+    SELECT EXISTS (SELECT 1 FROM session), (SELECT marked_at FROM inserted)
+"""
+
+
+def write_secure_attendance(params: dict):
+    """
+    Run MARK_SECURE_SQL on its own autocommit connection
+
+    Returns: (session_valid, marked_at) as described on MARK_SECURE_SQL
+    """
+    conn = get_db_connection()
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        cur.execute(MARK_SECURE_SQL, params)
+        row = cur.fetchone()
+        cur.close()
+        return row
+    finally:
+        conn.close()
+
 
 @router.get("/today", response_model=List[AttendanceLog])
-async def get_today_attendance():
+def get_today_attendance():
     """Get today's attendance logs (legacy system)"""
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     cur.execute(
         """
-        SELECT s.name, a.status, TO_CHAR(a.log_time, 'HH12:MI AM') as time 
-        FROM attendance_logs a 
-        JOIN students s ON a.student_id = s.id 
-        WHERE a.log_time::date = CURRENT_DATE 
+        SELECT s.name, a.status, TO_CHAR(a.log_time, 'HH12:MI AM') as time
+        FROM attendance_logs a
+        JOIN students s ON a.student_id = s.id
+        WHERE a.log_date = CURRENT_DATE
         ORDER BY a.log_time DESC
     """
     )
@@ -41,30 +89,15 @@ async def get_today_attendance():
 
 
 @router.post("/verify-location", response_model=LocationVerificationResponse)
-async def verify_location(request: LocationVerificationRequest):
+def verify_location(request: LocationVerificationRequest):
     """
     Step 1: Verify student location before allowing face capture
     Validates: WiFi, GPS, QR token, Device
     Returns score and whether student can proceed
     """
     try:
-        # Get session by OTP
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        cur.execute(
-            """
-            SELECT id, otp, course_name, classroom_lat, classroom_lon, 
-                   geofence_radius, allowed_wifi_ssid, expires_at, is_active
-            FROM attendance_sessions
-            WHERE otp = %s AND is_active = TRUE AND expires_at > NOW()
-        """,
-            (request.otp,),
-        )
-
-        session = cur.fetchone()
-        cur.close()
-        conn.close()
+        # Get session by OTP (cached per worker for the whole class)
+        session = session_cache.by_otp(request.otp)
 
         if not session:
             return LocationVerificationResponse(
@@ -100,6 +133,8 @@ async def verify_location(request: LocationVerificationRequest):
             session_id=str(session["id"]),
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Location verification error: {e}")
         raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
@@ -112,22 +147,11 @@ async def mark_attendance_secure(request: SecureAttendanceRequest):
     Requires: Valid session + Location verification + Face recognition
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
         # 1. Validate session
-        cur.execute(
-            """
-            SELECT id, otp, course_name, classroom_lat, classroom_lon,
-                   geofence_radius, allowed_wifi_ssid, expires_at, is_active
-            FROM attendance_sessions
-            WHERE id = %s AND otp = %s AND is_active = TRUE AND expires_at > NOW()
-        """,
-            (request.session_id, request.otp),
+        session = await asyncio.to_thread(
+            session_cache.by_id, request.session_id, request.otp
         )
 
-        session = cur.fetchone()
-
         if not session:
             return SecureAttendanceResponse(
                 success=False, message="Invalid session or OTP"
@@ -151,40 +175,27 @@ async def mark_attendance_secure(request: SecureAttendanceRequest):
             )
 
         # 3. Face detection and recognition
-        face_success, embedding, face_error = detect_face_from_base64(request.image)
+        face_success, embedding, face_error = await inference_executor.detect_face(
+            request.image
+        )
 
         if not face_success:
             return SecureAttendanceResponse(
                 success=False, message=face_error or "Face detection failed"
             )
 
-        # 4. Match face with enrolled students
-        if len(known_faces) == 0:
+        # 4. Match face against the session's course roster
+        candidates = await asyncio.to_thread(session_galleries.get, session)
+        match_ids, match_names, match_scores = await asyncio.to_thread(
+            candidates.match, embedding, k=1
+        )
+
+        if match_scores.shape[1] == 0:
             return SecureAttendanceResponse(
                 success=False, message="No students enrolled in system"
             )
 
-        # Convert embedding to numpy array
-        live_embedding = np.array(embedding).astype(np.float32)
-
-        # Find best match
-        best_match_name = None
-        best_similarity = 0.0
-
-        for known_face in known_faces:
-            known_embedding = known_face["embedding"]
-
-            # Cosine similarity
-            similarity = np.dot(live_embedding, known_embedding) / (
-                np.linalg.norm(live_embedding) * np.linalg.norm(known_embedding)
-            )
-
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match_name = known_face["name"]
-
-        # Check if similarity meets threshold
-        from config import settings
+        best_similarity = float(match_scores[0, 0])
 
         if best_similarity < settings.RECOGNITION_THRESHOLD:
             return SecureAttendanceResponse(
@@ -192,38 +203,13 @@ async def mark_attendance_secure(request: SecureAttendanceRequest):
                 message=f"Face not recognized. Confidence: {best_similarity:.2%}",
             )
 
-        # 5. Get student ID
-        cur.execute("SELECT id FROM students WHERE name = %s", (best_match_name,))
-        student_row = cur.fetchone()
-
-        if not student_row:
-            return SecureAttendanceResponse(
-                success=False, message="Student not found in database"
-            )
-
-        student_id = student_row["id"]
-
-        # 6. Check if already marked in this session
-        cur.execute(
-            """
-            SELECT id FROM session_attendance
-            WHERE session_id = %s AND student_id = %s
-        """,
-            (request.session_id, student_id),
-        )
-
-        existing = cur.fetchone()
-
-        if existing:
-            return SecureAttendanceResponse(
-                success=False,
-                message=f"{best_match_name} has already marked attendance for this session",
-            )
+        # 5. Student resolved by the gallery match
+        student_id = match_ids[0, 0]
+        best_match_name = match_names[0, 0]
 
-        # 7. Mark attendance
+        # 6. Prepare data for storage
         marked_at = datetime.now()
 
-        # Prepare data for storage
         device_info = {
             "fingerprint": request.device_fingerprint,
             "timestamp": marked_at.isoformat(),
@@ -248,35 +234,43 @@ async def mark_attendance_secure(request: SecureAttendanceRequest):
         }
 
         # Determine verification method
-        verification_method = "multi-factor"
         passed_checks = [
             k for k, v in verification_result["checks"].items() if v["passed"]
         ]
         verification_method = "+".join(passed_checks)
 
-        # Insert attendance record
-        cur.execute(
-            """
-            INSERT INTO session_attendance 
-            (session_id, student_id, marked_at, device_info, location_data, 
-             verification_scores, liveness_data, verification_method)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """,
-            (
-                request.session_id,
-                student_id,
-                marked_at,
-                json.dumps(device_info),
-                json.dumps(location_data),
-                json.dumps(verification_scores),
-                json.dumps(request.liveness_data) if request.liveness_data else None,
-                verification_method,
-            ),
+        # 7. Re-validate the session and mark attendance in one round trip
+        session_valid, inserted_at = await asyncio.to_thread(
+            write_secure_attendance,
+            {
+                "session_id": request.session_id,
+                "otp": request.otp,
+                "student_id": student_id,
+                "marked_at": marked_at,
+                "device_info": json.dumps(device_info),
+                "location_data": json.dumps(location_data),
+                "verification_scores": json.dumps(verification_scores),
+                "liveness_data": (
+                    json.dumps(request.liveness_data)
+                    if request.liveness_data
+                    else None
+                ),
+                "verification_method": verification_method,
+            },
         )
 
-        conn.commit()
-        cur.close()
-        conn.close()
+        if not session_valid:
+            # Closed or expired during face verification
+            session_cache.evict(request.session_id)
+            return SecureAttendanceResponse(
+                success=False, message="Invalid session or OTP"
+            )
+
+        if inserted_at is None:
+            return SecureAttendanceResponse(
+                success=False,
+                message=f"{best_match_name} has already marked attendance for this session",
+            )
 
         # 8. Success response
         return SecureAttendanceResponse(
@@ -295,6 +289,8 @@ async def mark_attendance_secure(request: SecureAttendanceRequest):
 
     except HTTPException:
         raise
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"❌ Secure attendance marking error: {e}")
         import traceback
@@ -306,7 +302,7 @@ async def mark_attendance_secure(request: SecureAttendanceRequest):
 
 
 @router.get("/export/csv")
-async def export_csv():
+def export_csv():
     """Export attendance as CSV"""
     try:
         content, filename = generate_csv_export()
@@ -315,12 +311,14 @@ async def export_csv():
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename={filename}"},
         )
+    except HTTPException:
+        raise
     except Exception as e:
         return {"error": str(e)}
 
 
 @router.get("/export/excel")
-async def export_excel():
+def export_excel():
     """Export attendance as Excel"""
     try:
         excel_file, filename = generate_excel_export()
@@ -329,12 +327,14 @@ async def export_excel():
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             headers={"Content-Disposition": f"attachment; filename={filename}"},
         )
+    except HTTPException:
+        raise
     except Exception as e:
         return {"error": str(e)}
 
 
 @router.get("/session/{session_id}/summary")
-async def get_session_attendance_summary(session_id: str):
+def get_session_attendance_summary(session_id: str):
     """
     Get attendance summary for a specific session
     """
@@ -1,29 +1,64 @@
-from fastapi import APIRouter
+import asyncio
+
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from datetime import datetime
-from services.camera_service import force_release_camera, generate_video_frames
-from models.schemas import CameraStatusResponse
-from dependencies import stream_active, camera
+from services.attendance_service import attendance_writer
+from services.camera_service import camera_manager
+from models.schemas import CameraListResponse, CameraStatusResponse
 
 router = APIRouter(prefix="/camera", tags=["camera"])
 
+MJPEG_MEDIA_TYPE = "multipart/x-mixed-replace; boundary=frame"
+
+
+def _camera_or_404(camera_id: str) -> str:
+    if camera_id not in camera_manager:
+        raise HTTPException(status_code=404, detail=f"Unknown camera '{camera_id}'")
+    return camera_id
+
+
+@router.get("/status", response_model=CameraListResponse)
+async def cameras_status():
+    """Get the status and stage throughput of every camera"""
+    return {
+        "cameras": [
+            camera_manager.status(camera_id) for camera_id in camera_manager.camera_ids
+        ],
+        "attendance_writer": attendance_writer.status(),
+    }
+
 
 @router.get("/video_feed")
 async def video_feed():
+    """Stream the default camera with face recognition"""
+    return await camera_video_feed(camera_manager.default_camera)
+
+
+@router.post("/release")
+async def release_camera():
+    """Force release the default camera"""
+    return await release_camera_by_id(camera_manager.default_camera)
+
+
+@router.get("/{camera_id}/video_feed")
+async def camera_video_feed(camera_id: str):
     """Stream live video with face recognition"""
+    _camera_or_404(camera_id)
     return StreamingResponse(
-        generate_video_frames(), media_type="multipart/x-mixed-replace; boundary=frame"
+        camera_manager.stream(camera_id), media_type=MJPEG_MEDIA_TYPE
     )
 
 
-@router.post("/release")
-async def release_camera():
-    """Force release camera"""
-    force_release_camera()
+@router.post("/{camera_id}/release")
+async def release_camera_by_id(camera_id: str):
+    """Force release a camera (ends its stream for every viewer)"""
+    _camera_or_404(camera_id)
+    await asyncio.to_thread(camera_manager.release, camera_id)
     return {"status": "Camera released", "timestamp": datetime.now().isoformat()}
 
 
-@router.get("/status", response_model=CameraStatusResponse)
-async def camera_status():
+@router.get("/{camera_id}/status", response_model=CameraStatusResponse)
+async def camera_status(camera_id: str):
     """Get camera status"""
-    return {"active": stream_active, "camera_object_exists": camera is not None}
+    return camera_manager.status(_camera_or_404(camera_id))
@@ -0,0 +1,128 @@
+"""
+Course roster endpoints
+"""
+
+from fastapi import APIRouter, HTTPException
+from psycopg2.extras import RealDictCursor
+from dependencies import get_db_connection, session_galleries
+from models.schemas import DeleteResponse, RosterResponse, RosterUpdateRequest
+from services.session_sync import publish_roster_change
+
+router = APIRouter(prefix="/courses", tags=["courses"])
+
+
+def fetch_roster(course_name: str) -> RosterResponse:
+    """Load a course roster with student details"""
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(
+        """
+        SELECT s.id::text AS id, s.name, s.photo_url
+        FROM course_rosters r
+        JOIN students s ON r.student_id = s.id
+        WHERE r.course_name = %s
+        ORDER BY s.name ASC
+    """,
+        (course_name,),
+    )
+    students = cur.fetchall()
+    cur.close()
+    conn.close()
+
+    return RosterResponse(
+        course_name=course_name, total_students=len(students), students=students
+    )
+
+
+@router.get("/{course_name}/roster", response_model=RosterResponse)
+def get_course_roster(course_name: str):
+    """
+    Get all students enrolled in a course
+    """
+    try:
+        return fetch_roster(course_name)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Get roster error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get roster: {str(e)}")
+
+
+@router.post("/{course_name}/roster", response_model=RosterResponse)
+def add_to_course_roster(course_name: str, request: RosterUpdateRequest):
+    """
+    Add students to a course roster
+    Active sessions of the course rebuild their candidate gallery
+    """
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            INSERT INTO course_rosters (course_name, student_id)
+            SELECT %s, s.id FROM students s WHERE s.id = ANY(%s::uuid[])
+            ON CONFLICT DO NOTHING
+        """,
+            (course_name, [str(sid) for sid in request.student_ids]),
+        )
+        if cur.rowcount:
+            # Other workers drop the course's session galleries on commit
+            publish_roster_change(cur, course_name)
+
+        conn.commit()
+        cur.close()
+        conn.close()
+
+        session_galleries.evict_course(course_name)
+
+        return fetch_roster(course_name)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Roster update error: {e}")
+        raise HTTPException(
+            status_code=500, detail=f"Failed to update roster: {str(e)}"
+        )
+
+
+@router.delete("/{course_name}/roster/{student_id}", response_model=DeleteResponse)
+def remove_from_course_roster(course_name: str, student_id: str):
+    """
+    Remove a student from a course roster
+    """
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            DELETE FROM course_rosters
+            WHERE course_name = %s AND student_id = %s
+            RETURNING student_id
+        """,
+            (course_name, student_id),
+        )
+
+        result = cur.fetchone()
+        if result:
+            publish_roster_change(cur, course_name)
+        conn.commit()
+        cur.close()
+        conn.close()
+
+        if not result:
+            return DeleteResponse(success=False, message="Student not on roster")
+
+        session_galleries.evict_course(course_name)
+
+        return DeleteResponse(success=True, message="Student removed from roster")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Roster delete error: {e}")
+        raise HTTPException(
+            status_code=500, detail=f"Failed to update roster: {str(e)}"
+        )
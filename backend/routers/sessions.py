@@ -2,13 +2,22 @@
 Session management endpoints
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, File, Form, UploadFile
 from fastapi.responses import JSONResponse
 from datetime import datetime, timedelta
+from typing import Optional
+import os
 import random
+import shutil
 import string
+import tempfile
 from psycopg2.extras import RealDictCursor
-from dependencies import get_db_connection
+from dependencies import (
+    get_db_connection,
+    get_face_app,
+    session_cache,
+    session_galleries,
+)
 from models.schemas import (
     SessionCreateRequest,
     SessionCreateResponse,
@@ -16,8 +25,11 @@ from models.schemas import (
     SessionStatusResponse,
     SessionDetailResponse,
     SessionAttendanceRecord,
+    VideoAttendanceResponse,
 )
 from services.location_service import LocationService
+from services.session_sync import publish_session_change
+from services.video_attendance import process_video, record_video_attendance
 from config import settings
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
@@ -29,7 +41,7 @@ def generate_otp(length: int = 6) -> str:
 
 
 @router.post("/create", response_model=SessionCreateResponse)
-async def create_attendance_session(request: SessionCreateRequest):
+def create_attendance_session(request: SessionCreateRequest):
     """
     Create a new attendance session
     Professor endpoint to start attendance collection
@@ -84,6 +96,9 @@ async def create_attendance_session(request: SessionCreateRequest):
         cur.close()
         conn.close()
 
+        # Pre-build the roster gallery used by mark-secure
+        session_galleries.build(session_id, request.course_name, expires_at)
+
         # Generate QR code URL
         qr_code_url = f"{settings.FRONTEND_URL or 'http://localhost:3000'}/mark-attendance?session={session_id}&token={actual_qr_token}"
 
@@ -96,6 +111,8 @@ async def create_attendance_session(request: SessionCreateRequest):
             expires_at=expires_at,
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Session creation error: {e}")
         raise HTTPException(
@@ -104,7 +121,7 @@ async def create_attendance_session(request: SessionCreateRequest):
 
 
 @router.get("/{session_id}/qr-token", response_model=QRTokenResponse)
-async def get_dynamic_qr_token(session_id: str):
+def get_dynamic_qr_token(session_id: str):
     """
     Get current dynamic QR token for session
     Refreshes every 30 seconds
@@ -157,7 +174,7 @@ async def get_dynamic_qr_token(session_id: str):
 
 
 @router.get("/{session_id}/status", response_model=SessionStatusResponse)
-async def get_session_status(session_id: str):
+def get_session_status(session_id: str):
     """
     Get current status of a session
     """
@@ -212,7 +229,7 @@ async def get_session_status(session_id: str):
 
 
 @router.get("/{session_id}/details", response_model=SessionDetailResponse)
-async def get_session_details(session_id: str):
+def get_session_details(session_id: str):
     """
     Get detailed session information including all attendance records
     """
@@ -305,7 +322,7 @@ async def get_session_details(session_id: str):
 
 
 @router.post("/{session_id}/close")
-async def close_session(session_id: str):
+def close_session(session_id: str):
     """
     Manually close a session before expiry
     """
@@ -324,6 +341,9 @@ async def close_session(session_id: str):
         )
 
         result = cur.fetchone()
+        if result:
+            # Other workers drop their cached session once this commits
+            publish_session_change(cur, "close", session_id)
         conn.commit()
         cur.close()
         conn.close()
@@ -333,6 +353,9 @@ async def close_session(session_id: str):
                 status_code=404, detail="Session not found or already closed"
             )
 
+        session_cache.evict(session_id)
+        session_galleries.evict(session_id)
+
         return {"success": True, "message": "Session closed successfully"}
 
     except HTTPException:
@@ -344,8 +367,82 @@ async def close_session(session_id: str):
         )
 
 
+def _process_uploaded_video(video: UploadFile, gallery, sample_fps: float):
+    """Spool an upload to disk (OpenCV reads from paths) and process it"""
+    suffix = os.path.splitext(video.filename or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(video.file, tmp)
+    try:
+        return process_video(
+            tmp.name,
+            get_face_app(),
+            gallery,
+            settings.RECOGNITION_THRESHOLD,
+            sample_fps=sample_fps,
+            workers=settings.VIDEO_DECODE_WORKERS,
+            batch_size=settings.VIDEO_BATCH_SIZE,
+            min_sightings=settings.VIDEO_MIN_SIGHTINGS,
+        )
+    finally:
+        os.remove(tmp.name)
+
+
+@router.post("/{session_id}/video-attendance", response_model=VideoAttendanceResponse)
+def video_attendance(
+    session_id: str,
+    video: UploadFile = File(...),
+    sample_fps: Optional[float] = Form(None),
+):
+    """
+    Mark attendance from a recorded lecture video
+    Students on the session's roster seen often enough are marked present
+    """
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(
+            "SELECT id, course_name, expires_at FROM attendance_sessions WHERE id = %s",
+            (session_id,),
+        )
+        session = cur.fetchone()
+        cur.close()
+        conn.close()
+
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        # Sync handler: runs in the threadpool, like the decode it waits on
+        report = _process_uploaded_video(
+            video,
+            session_galleries.get(session),
+            sample_fps or settings.VIDEO_SAMPLE_FPS,
+        )
+
+        conn = get_db_connection()
+        try:
+            newly_marked = record_video_attendance(
+                conn, session_id, report["students"]
+            )
+        finally:
+            conn.close()
+
+        return VideoAttendanceResponse(
+            success=True, session_id=session_id, newly_marked=newly_marked, **report
+        )
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Video attendance error: {e}")
+        raise HTTPException(
+            status_code=500, detail=f"Failed to process video: {str(e)}"
+        )
+
+
 @router.get("/active", response_model=list[SessionStatusResponse])
-async def get_active_sessions():
+def get_active_sessions():
     """
     Get all currently active sessions
     """
@@ -390,6 +487,8 @@ async def get_active_sessions():
             for session in sessions
         ]
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Get active sessions error: {e}")
         raise HTTPException(
@@ -1,27 +1,38 @@
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, HTTPException, Response
 from typing import List
+import asyncio
 import uuid
-import json
 import io
 import cv2
-from dependencies import get_db_connection, minio_client, known_faces
+from dependencies import (
+    get_db_connection,
+    inference_executor,
+    minio_client,
+    face_gallery,
+    session_galleries,
+)
 from models.schemas import (
     EnrollRequest,
     EnrollResponse,
     StudentResponse,
     DeleteResponse,
+    TemplateAddRequest,
+    TemplateResponse,
 )
-from services.face_service import detect_face_from_base64
-from services.camera_service import force_release_camera
-from utils.database import load_all_students
+from services.camera_service import camera_manager
+from services.gallery_sync import publish_gallery_change
+from services.gallery_service import to_vector_literal
+from services.inference_service import InferenceBusyError
+from utils.database import load_student
+from config import settings
 from psycopg2.extras import RealDictCursor
-import time
+import numpy as np
 
 router = APIRouter(prefix="/students", tags=["students"])
 
 
 @router.get("", response_model=List[StudentResponse])
-async def get_all_students():
+def get_all_students():
     """Get all registered students"""
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -32,72 +43,171 @@ async def get_all_students():
     return res
 
 
+def save_student(name: str, image: str, embedding) -> str:
+    """
+    Store a new student's photo in MinIO and embedding in the database
+
+    Returns: The new student id
+    """
+    # Generate IDs
+    student_id = str(uuid.uuid4())
+    photo_name = f"{student_id}.jpg"
+
+    # Decode and save image to MinIO
+    image_data = image.split(",")[1]
+    import base64
+
+    img_bytes = base64.b64decode(image_data)
+    nparr = np.frombuffer(img_bytes, np.uint8)
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+    _, encoded_img = cv2.imencode(".jpg", img)
+    minio_client.put_object(
+        "student-photos",
+        photo_name,
+        io.BytesIO(encoded_img.tobytes()),
+        len(encoded_img.tobytes()),
+        "image/jpeg",
+    )
+
+    # Save to database
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO students (id, name, embedding, photo_url) VALUES (%s, %s, %s, %s)",
+        (
+            student_id,
+            name,
+            to_vector_literal(np.asarray(embedding, dtype=np.float32)),
+            photo_name,
+        ),
+    )
+    publish_gallery_change(cur, "add", student_id)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    # Add to the in-memory gallery
+    face_gallery.add(student_id, name, embedding)
+    return student_id
+
+
+def save_template(student_id: str, embedding) -> TemplateResponse:
+    """Add a template if the student exists and is under the template limit"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT COUNT(t.id) FROM students s
+        LEFT JOIN student_templates t ON t.student_id = s.id
+        WHERE s.id = %s
+        GROUP BY s.id
+    """,
+        (student_id,),
+    )
+    row = cur.fetchone()
+
+    if not row:
+        cur.close()
+        conn.close()
+        return TemplateResponse(success=False, message="Student not found")
+
+    if row[0] >= settings.MAX_TEMPLATES_PER_STUDENT:
+        cur.close()
+        conn.close()
+        return TemplateResponse(
+            success=False,
+            message=f"Student already has {row[0]} templates",
+            student_id=student_id,
+            template_count=row[0],
+        )
+
+    cur.execute(
+        "INSERT INTO student_templates (student_id, embedding) VALUES (%s, %s)",
+        (student_id, to_vector_literal(np.asarray(embedding, dtype=np.float32))),
+    )
+    publish_gallery_change(cur, "add", student_id)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    # Reload the full template set into the in-memory galleries
+    student = load_student(student_id)
+    face_gallery.add(student["id"], student["name"], student["embedding"])
+    session_galleries.update_student(
+        student["id"], student["name"], student["embedding"]
+    )
+
+    return TemplateResponse(
+        success=True,
+        message=f"Added template for {student['name']}",
+        student_id=student_id,
+        template_count=len(student["embedding"]),
+    )
+
+
 @router.post("/enroll", response_model=EnrollResponse)
 async def enroll_student(data: EnrollRequest):
     """Enroll a new student"""
-    global known_faces
 
-    # Release camera first
-    force_release_camera()
-    time.sleep(0.5)
+    # Release local cameras first so the enrolment webcam is free
+    await asyncio.to_thread(camera_manager.release_devices)
+    await asyncio.sleep(0.5)
 
     try:
         # Detect face and get embedding
-        success, embedding, error = detect_face_from_base64(data.image)
+        success, embedding, error = await inference_executor.detect_face(data.image)
 
         if not success:
             return EnrollResponse(
                 success=False, message=error or "Face detection failed"
             )
 
-        # Generate IDs
-        student_id = str(uuid.uuid4())
-        photo_name = f"{student_id}.jpg"
-
-        # Decode and save image to MinIO
-        image_data = data.image.split(",")[1]
-        import base64
-        import numpy as np
-
-        img_bytes = base64.b64decode(image_data)
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        _, encoded_img = cv2.imencode(".jpg", img)
-        minio_client.put_object(
-            "student-photos",
-            photo_name,
-            io.BytesIO(encoded_img.tobytes()),
-            len(encoded_img.tobytes()),
-            "image/jpeg",
+        # MinIO upload and insert are blocking; keep them off the event loop
+        student_id = await asyncio.to_thread(
+            save_student, data.name, data.image, embedding
         )
 
-        # Save to database
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO students (id, name, embedding, photo_url) VALUES (%s, %s, %s, %s)",
-            (student_id, data.name, json.dumps(embedding), photo_name),
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
-
-        # Reload known faces
-        known_faces = load_all_students()
-
         return EnrollResponse(
             success=True, message=f"Registered {data.name}!", student_id=student_id
         )
 
+    except HTTPException:
+        raise
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         return EnrollResponse(success=False, message=str(e))
 
 
+@router.post("/{student_id}/templates", response_model=TemplateResponse)
+async def add_student_template(student_id: str, data: TemplateAddRequest):
+    """
+    Add another face template to an enrolled student
+    E.g. a capture under different lighting; matching scores every template
+    """
+
+    try:
+        success, embedding, error = await inference_executor.detect_face(data.image)
+
+        if not success:
+            return TemplateResponse(
+                success=False, message=error or "Face detection failed"
+            )
+
+        return await asyncio.to_thread(save_template, student_id, embedding)
+
+    except HTTPException:
+        raise
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        return TemplateResponse(success=False, message=str(e))
+
+
 @router.delete("/{student_id}", response_model=DeleteResponse)
-async def delete_student(student_id: str):
+def delete_student(student_id: str):
     """Delete a student"""
-    global known_faces
 
     try:
         conn = get_db_connection()
@@ -112,6 +222,7 @@ async def delete_student(student_id: str):
 
         # Delete from database
         cur.execute("DELETE FROM students WHERE id = %s", (student_id,))
+        publish_gallery_change(cur, "remove", student_id)
 
         # Delete from MinIO
         try:
@@ -123,17 +234,20 @@ async def delete_student(student_id: str):
         cur.close()
         conn.close()
 
-        # Reload known faces
-        known_faces = load_all_students()
+        # Drop from the in-memory gallery and any session rosters
+        face_gallery.remove(student_id)
+        session_galleries.remove_student(student_id)
 
         return DeleteResponse(success=True, message="Student deleted")
 
+    except HTTPException:
+        raise
     except Exception as e:
         return DeleteResponse(success=False, message=str(e))
 
 
 @router.get("/photo/{photo_name}")
-async def get_student_photo(photo_name: str):
+def get_student_photo(photo_name: str):
     """Retrieve student photo from MinIO"""
     try:
         response = minio_client.get_object("student-photos", photo_name)
@@ -0,0 +1,154 @@
+"""
+Statically quantize a model pack's detector and recognizer to int8
+
+Writes a new pack next to the source one (e.g. buffalo_l_int8) holding the
+int8 detector and recognizer plus copies of the remaining fp32 models, so
+it can be used as FACE_MODEL directly. Activation ranges are calibrated on
+a folder of face photos: whole images at every detection size for the
+detector, aligned 112x112 crops for the recognizer.
+
+Usage (from backend/):
+    python -m scripts.quantize_models --calibration-dir data/calibration
+"""
+
+import argparse
+import glob
+import os
+import shutil
+
+import cv2
+import numpy as np
+from insightface.utils import face_align
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+
+from config import settings
+from services.face_engine import DEVICE_PROVIDERS, create_face_app
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+
+class BlobReader(CalibrationDataReader):
+    """Feeds preprocessed blobs to the calibrator one at a time"""
+
+    def __init__(self, input_name: str, blobs):
+        self.input_name = input_name
+        self._blobs = iter(blobs)
+
+    def get_next(self):
+        blob = next(self._blobs, None)
+        return None if blob is None else {self.input_name: blob}
+
+
+def detector_blob(detector, img: np.ndarray, det_size) -> np.ndarray:
+    """Letterboxed input as RetinaFace.detect builds it"""
+    width, height = det_size
+    scale = min(width / img.shape[1], height / img.shape[0])
+    resized = cv2.resize(img, (int(img.shape[1] * scale), int(img.shape[0] * scale)))
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    canvas[: resized.shape[0], : resized.shape[1]] = resized
+    return cv2.dnn.blobFromImage(
+        canvas,
+        1.0 / detector.input_std,
+        (width, height),
+        (detector.input_mean,) * 3,
+        swapRB=True,
+    )
+
+
+def load_calibration_images(directory: str, limit: int):
+    paths = sorted(
+        path
+        for pattern in IMAGE_PATTERNS
+        for path in glob.glob(os.path.join(directory, "**", pattern), recursive=True)
+    )[:limit]
+    if not paths:
+        raise SystemExit(f"No calibration images found in {directory}")
+    return [img for img in (cv2.imread(path) for path in paths) if img is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--model", default="buffalo_l")
+    parser.add_argument("--output", default=None, help="Defaults to <model>_int8")
+    parser.add_argument("--root", default="~/.insightface")
+    parser.add_argument("--calibration-dir", required=True)
+    parser.add_argument("--limit", type=int, default=300)
+    args = parser.parse_args()
+
+    output_name = args.output or f"{args.model}_int8"
+    output_dir = os.path.join(os.path.expanduser(args.root), "models", output_name)
+
+    providers, ctx_id = DEVICE_PROVIDERS["cpu"]
+    app = create_face_app(
+        args.model, settings.DETECTION_SIZE, providers, ctx_id, modules=None
+    )
+    detector = app.models["detection"]
+    recognizer = app.models["recognition"]
+
+    images = load_calibration_images(args.calibration_dir, args.limit)
+    det_sizes = {
+        tuple(settings.DETECTION_SIZE),
+        tuple(settings.SELFIE_DETECTION_SIZE),
+    }
+    crops = []
+    for img in images:
+        _, kpss = detector.detect(img, max_num=0, metric="default")
+        crops.extend(
+            face_align.norm_crop(
+                img, landmark=kps, image_size=recognizer.input_size[0]
+            )
+            for kps in kpss
+        )
+    print(f"Calibrating on {len(images)} images / {len(crops)} faces")
+
+    os.makedirs(output_dir, exist_ok=True)
+    pack_dir = os.path.dirname(detector.model_file)
+    for model_file in glob.glob(os.path.join(pack_dir, "*.onnx")):
+        target = os.path.join(output_dir, os.path.basename(model_file))
+        if model_file == detector.model_file:
+            blobs = (
+                detector_blob(detector, img, size)
+                for size in det_sizes
+                for img in images
+            )
+            reader = BlobReader(detector.input_name, blobs)
+        elif model_file == recognizer.model_file:
+            blobs = (
+                cv2.dnn.blobFromImage(
+                    crop,
+                    1.0 / recognizer.input_std,
+                    recognizer.input_size,
+                    (recognizer.input_mean,) * 3,
+                    swapRB=True,
+                )
+                for crop in crops
+            )
+            reader = BlobReader(recognizer.input_name, blobs)
+        else:
+            shutil.copyfile(model_file, target)
+            print(f"Copied {os.path.basename(model_file)} (fp32)")
+            continue
+
+        quantize_static(
+            model_file,
+            target,
+            reader,
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            weight_type=QuantType.QInt8,
+            activation_type=QuantType.QUInt8,
+            calibrate_method=CalibrationMethod.Percentile,
+        )
+        print(f"Quantized {os.path.basename(model_file)} -> int8")
+
+    print(f"✅ Wrote {output_dir}; set FACE_MODEL={output_name} to use it")
+
+
+if __name__ == "__main__":
+    main()
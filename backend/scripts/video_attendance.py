@@ -0,0 +1,79 @@
+"""
+Mark session attendance from a recorded lecture video
+
+Uses the same face model, gallery and roster scoping as the API. With
+--dry-run only the sightings and throughput are printed.
+
+Usage (from backend/):
+    python -m scripts.video_attendance lecture.mp4 --session-id <uuid>
+"""
+
+import argparse
+
+from psycopg2.extras import RealDictCursor
+
+from config import settings
+from dependencies import get_db_connection, get_face_app, session_galleries
+from services.gallery_sync import bootstrap_gallery
+from services.video_attendance import process_video, record_video_attendance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("video")
+    parser.add_argument("--session-id", required=True)
+    parser.add_argument("--sample-fps", type=float, default=settings.VIDEO_SAMPLE_FPS)
+    parser.add_argument("--workers", type=int, default=settings.VIDEO_DECODE_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=settings.VIDEO_BATCH_SIZE)
+    parser.add_argument(
+        "--min-sightings", type=int, default=settings.VIDEO_MIN_SIGHTINGS
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(
+        "SELECT id, course_name, expires_at FROM attendance_sessions WHERE id = %s",
+        (args.session_id,),
+    )
+    session = cur.fetchone()
+    cur.close()
+    if not session:
+        raise SystemExit(f"❌ Session {args.session_id} not found")
+
+    if settings.RECOGNITION_BACKEND == "memory":
+        bootstrap_gallery()
+
+    report = process_video(
+        args.video,
+        get_face_app(),
+        session_galleries.get(session),
+        settings.RECOGNITION_THRESHOLD,
+        sample_fps=args.sample_fps,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        min_sightings=args.min_sightings,
+    )
+
+    for student in report["students"]:
+        print(
+            f"{student['name']:<30} {student['sightings']:>5} sightings"
+            f"  best {student['best_score']:.2f}"
+            f"  {student['first_seen']:7.1f}s - {student['last_seen']:7.1f}s"
+        )
+    print(
+        f"{report['frames_sampled']} frames / {report['faces_detected']} faces"
+        f" of {report['video_seconds']}s video in {report['processing_seconds']}s"
+        f" | {report['frames_per_second']} frames/s"
+        f" | {report['realtime_factor']}x real time"
+    )
+
+    if not args.dry_run:
+        marked = record_video_attendance(conn, session["id"], report["students"])
+        print(f"✅ Marked {marked} new students present")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Approximate nearest-neighbour indexes for large face galleries
+Each index stores gallery slot numbers as labels and answers cosine top-k
+queries, supporting incremental inserts and deletes
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Tuple
+
+import numpy as np
+
+# Smallest capacity an index is created with, so a small gallery does not
+# outgrow its index on the first few enrolments
+MIN_INDEX_CAPACITY = 1024
+
+
+class ReadWriteLock:
+    """Many concurrent readers or one writer; waiting writers go first"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class HNSWIndex:
+    """
+    In-process HNSW graph (hnswlib) in cosine space
+
+    Deleted slots are tombstoned with mark_deleted, so labels stay valid
+    until the gallery is rebuilt.
+
+    hnswlib does not make a search safe against a concurrent insert or
+    delete, so searches share a read lock and add/remove take it
+    exclusively. The index is created with headroom and never resized in
+    place: an add that would overflow it fills a larger copy instead, and
+    readers still holding this index keep searching it undisturbed.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        capacity: int,
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+    ):
+        import hnswlib
+
+        self.ef_search = ef_search
+        self._lock = ReadWriteLock()
+        self._live = 0
+        self._index = hnswlib.Index(space="cosine", dim=dim)
+        self._index.init_index(
+            max_elements=max(2 * capacity, MIN_INDEX_CAPACITY),
+            M=m,
+            ef_construction=ef_construction,
+        )
+        self._index.set_ef(ef_search)
+
+    def __len__(self) -> int:
+        """Number of live (not deleted) labels"""
+        return self._live
+
+    def add(self, slots: np.ndarray, vectors: np.ndarray) -> "HNSWIndex":
+        """
+        Insert vectors labelled with their gallery slots
+
+        Returns:
+            This index, or a larger copy holding the new vectors if this
+            one is full; the caller publishes the copy in its place
+        """
+        if len(slots) == 0:
+            return self
+
+        needed = self._index.get_current_count() + len(slots)
+        if needed > self._index.get_max_elements():
+            return self._grown(2 * needed).add(slots, vectors)
+
+        with self._lock.write():
+            self._index.add_items(vectors, np.asarray(slots, dtype=np.int64))
+            self._live += len(slots)
+        return self
+
+    def remove(self, slots: np.ndarray):
+        """Tombstone gallery slots so they are never returned again"""
+        with self._lock.write():
+            for slot in slots:
+                self._index.mark_deleted(int(slot))
+            self._live -= len(slots)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k search; k shrinks to the number of live labels
+
+        Returns:
+            (slots, scores) shaped (q, k), scores as cosine similarity
+
+        Raises:
+            RuntimeError: hnswlib found fewer than k live neighbours
+                (possible once many slots are deleted)
+        """
+        with self._lock.read():
+            k = min(k, self._live)
+            if k == 0:
+                empty = np.empty((len(queries), 0))
+                return empty.astype(np.int64), empty.astype(np.float32)
+            self._index.set_ef(max(self.ef_search, k))
+            labels, distances = self._index.knn_query(queries, k=k)
+        return labels.astype(np.int64), (1.0 - distances).astype(np.float32)
+
+    def _grown(self, capacity: int) -> "HNSWIndex":
+        """Copy of this index with room for capacity labels"""
+        import hnswlib
+
+        grown = object.__new__(HNSWIndex)
+        grown.ef_search = self.ef_search
+        grown._lock = ReadWriteLock()
+        with self._lock.read():
+            grown._live = self._live
+            grown._index = hnswlib.Index(self._index)
+        grown._index.resize_index(capacity)
+        grown._index.set_ef(self.ef_search)
+        return grown
+
+
+ANN_BACKENDS = {
+    "hnsw": HNSWIndex,
+}
+
+
+def create_ann_index(backend: str, dim: int, capacity: int, **params):
+    """
+    Build an empty ANN index for the configured backend
+
+    Raises:
+        ValueError: Unknown backend name
+    """
+    if backend not in ANN_BACKENDS:
+        raise ValueError(
+            f"Unknown ANN backend '{backend}'. Choose from: {', '.join(ANN_BACKENDS)}"
+        )
+    return ANN_BACKENDS[backend](dim, capacity, **params)
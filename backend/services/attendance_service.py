@@ -1,50 +1,164 @@
-from datetime import datetime
+"""
+Legacy daily attendance log (attendance_logs) for the camera path
+One row per student per day whose log_time is when they were last seen.
+Camera sightings are buffered and written behind in batches rather than
+with a connection and three queries per recognized face.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+from config import settings
 from dependencies import get_db_connection
 
+# One row per student per day (migration 007); keeps the newest sighting
+UPSERT_LOGS_SQL = """
+    INSERT INTO attendance_logs (student_id, status, log_time)
+    VALUES %s
+    ON CONFLICT (student_id, log_date)
+    DO UPDATE SET log_time = GREATEST(attendance_logs.log_time, EXCLUDED.log_time)
+"""
+
+
+class AttendanceWriter:
+    """
+    Write-behind buffer for attendance sightings
+
+    log() only touches memory: sightings are coalesced per (student, day)
+    into a pending buffer that a background thread flushes as one
+    multi-row upsert per interval. A student already written today is
+    re-queued only once their last-seen time has moved on by
+    min_update_seconds, so a seated class costs a handful of rows per
+    minute. A failed flush keeps its rows for the next attempt.
+
+    Args:
+        connection_factory: Returns a new DB connection
+        flush_interval: Seconds between flushes
+        min_update_seconds: Last-seen granularity for already written rows
+    """
 
-def log_attendance(student_name: str):
-    """Log attendance for a student"""
-    now = datetime.now()
-    today = now.date()
+    def __init__(
+        self,
+        connection_factory,
+        flush_interval: float = 2.0,
+        min_update_seconds: float = 60.0,
+    ):
+        self.connection_factory = connection_factory
+        self.flush_interval = flush_interval
+        self.min_update = timedelta(seconds=min_update_seconds)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # (student_id, day) -> newest unwritten sighting
+        self._pending: Dict[Tuple[str, object], datetime] = {}
+        # (student_id, day) -> last-seen time already written
+        self._written: Dict[Tuple[str, object], datetime] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
 
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+    def log(self, student_id, seen_at: Optional[datetime] = None):
+        """Record a sighting; never blocks on the database"""
+        seen_at = seen_at or datetime.now()
+        key = (str(student_id), seen_at.date())
+        with self._lock:
+            written = self._written.get(key)
+            if written is not None and seen_at - written < self.min_update:
+                return
+            if self._pending.get(key, seen_at) <= seen_at:
+                self._pending[key] = seen_at
 
-        # Get student ID
-        cur.execute("SELECT id FROM students WHERE name = %s", (student_name,))
-        res = cur.fetchone()
+    def flush(self) -> int:
+        """
+        Write every pending sighting in one transaction
 
-        if res:
-            student_id = res[0]
+        Returns: Number of sightings written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
 
-            # Check if already logged today
-            cur.execute(
-                """
-                SELECT id FROM attendance_logs 
-                WHERE student_id = %s AND log_time::date = %s
-            """,
-                (student_id, today),
+            started = time.perf_counter()
+            try:
+                conn = self.connection_factory()
+                try:
+                    cur = conn.cursor()
+                    execute_values(
+                        cur,
+                        UPSERT_LOGS_SQL,
+                        [(sid, seen) for (sid, _), seen in batch.items()],
+                        template="(%s::uuid, 'Present', %s::timestamp)",
+                        page_size=len(batch),
+                    )
+                    conn.commit()
+                    cur.close()
+                finally:
+                    conn.close()
+            except Exception as e:
+                self.failures += 1
+                print(f"❌ Attendance DB Error: {e}")
+                with self._lock:
+                    for key, seen in batch.items():
+                        if self._pending.get(key, seen) <= seen:
+                            self._pending[key] = seen
+                return 0
+
+            today = datetime.now().date()
+            with self._lock:
+                # Drop days that have passed so the dedupe map stays small
+                self._written = {
+                    key: seen for key, seen in self._written.items() if key[1] >= today
+                }
+                self._written.update(batch)
+            self.flushes += 1
+            self.rows_written += len(batch)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return len(batch)
+
+    def start(self):
+        """Start the background flush thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="attendance-writer", daemon=True
             )
-            existing = cur.fetchone()
-
-            if existing:
-                # Update existing log
-                cur.execute(
-                    "UPDATE attendance_logs SET log_time = %s WHERE id = %s",
-                    (now, existing[0]),
-                )
-            else:
-                # Insert new log
-                cur.execute(
-                    "INSERT INTO attendance_logs (student_id, status, log_time) VALUES (%s, 'Present', %s)",
-                    (student_id, now),
-                )
-
-            conn.commit()
-
-        cur.close()
-        conn.close()
-
-    except Exception as e:
-        print(f"❌ Attendance DB Error: {e}")
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still pending"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def status(self) -> Dict:
+        with self._lock:
+            depth = len(self._pending)
+        return {
+            "queue_depth": depth,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "last_flush_ms": round(self.last_flush_ms, 1),
+        }
+
+
+# Shared by every camera of this process
+attendance_writer = AttendanceWriter(
+    get_db_connection,
+    flush_interval=settings.ATTENDANCE_FLUSH_SECONDS,
+    min_update_seconds=settings.ATTENDANCE_MIN_UPDATE_SECONDS,
+)
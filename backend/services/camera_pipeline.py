@@ -0,0 +1,323 @@
+"""
+Pipelined live video: capture, inference and encode run as separate stages
+Capture keeps only the newest frame, inference analyses the newest frame
+at whatever rate it manages, and the encoder streams at a fixed frame
+rate drawing the most recent inference results. A slow inference frame
+no longer stalls capture, and stale frames are dropped instead of queued.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class StageStats:
+    """Frame rate over a sliding window and a drop counter for one stage"""
+
+    def __init__(self, window_seconds: float = 2.0):
+        self.window_seconds = window_seconds
+        self.frames = 0
+        self.dropped = 0
+        self._times = deque()
+        self._lock = threading.Lock()
+
+    def tick(self):
+        now = time.monotonic()
+        with self._lock:
+            self.frames += 1
+            self._times.append(now)
+            while self._times[0] < now - self.window_seconds:
+                self._times.popleft()
+
+    def drop(self, count: int = 1):
+        with self._lock:
+            self.dropped += count
+
+    @property
+    def fps(self) -> float:
+        with self._lock:
+            if len(self._times) < 2:
+                return 0.0
+            span = time.monotonic() - self._times[0]
+            return (len(self._times) - 1) / span if span > 0 else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "fps": round(self.fps, 1),
+            "frames": self.frames,
+            "dropped": self.dropped,
+        }
+
+
+class LatestSlot:
+    """Single-slot buffer: put overwrites, readers wait for a newer item"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+
+    def put(self, item):
+        with self._cond:
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def latest(self) -> Tuple[int, Any]:
+        with self._cond:
+            return self._seq, self._item
+
+    def wait_newer(self, seq: int, timeout: float) -> Tuple[int, Any]:
+        """(seq, item) once seq advances past the given one, or on timeout"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq, timeout)
+            return self._seq, self._item
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class CameraPipeline:
+    """
+    Capture and inference threads feeding an encoder generator
+
+    Args:
+        read_frame: Returns (success, frame); a failed read stops the pipeline
+        analyse: Frame -> overlay result; runs on the inference thread
+        draw: (frame, overlay) -> None, annotates a copy of the frame in place
+        target_fps: Encoder output rate
+        jpeg_quality: cv2 JPEG quality of streamed frames
+    """
+
+    def __init__(
+        self,
+        read_frame: Callable[[], Tuple[bool, Optional[np.ndarray]]],
+        analyse: Callable[[np.ndarray], Any],
+        draw: Callable[[np.ndarray, Any], None],
+        target_fps: float = 15.0,
+        jpeg_quality: int = 80,
+    ):
+        self.read_frame = read_frame
+        self.analyse = analyse
+        self.draw = draw
+        self.target_fps = target_fps
+        self.jpeg_quality = jpeg_quality
+        self.stats = {
+            "capture": StageStats(),
+            "inference": StageStats(),
+            "encode": StageStats(),
+        }
+        self._frames = LatestSlot()
+        self._overlay = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._stop.is_set()
+
+    def start(self):
+        """Start the capture and inference threads"""
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._capture, name="camera-capture", daemon=True
+            ),
+            threading.Thread(
+                target=self._inference, name="camera-inference", daemon=True
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def request_stop(self):
+        """Signal all stages to stop without waiting for them"""
+        self._stop.set()
+        self._frames.wake()
+
+    def stop(self):
+        """Stop both threads and wake any waiting encoder"""
+        self.request_stop()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2.0)
+
+    def _capture(self):
+        stats = self.stats["capture"]
+        while not self._stop.is_set():
+            success, frame = self.read_frame()
+            if not success:
+                self.request_stop()
+                break
+            self._frames.put(frame)
+            stats.tick()
+
+    def _inference(self):
+        stats = self.stats["inference"]
+        seen = 0
+        while not self._stop.is_set():
+            seq, frame = self._frames.wait_newer(seen, timeout=0.5)
+            if seq == seen or frame is None:
+                continue
+            if seen:
+                stats.drop(seq - seen - 1)  # Captured, never analysed
+            seen = seq
+            try:
+                self._overlay = self.analyse(frame)
+            except Exception as e:
+                print(f"⚠️ Stream inference error: {e}")
+                continue
+            stats.tick()
+
+    def frames(self) -> Iterator[bytes]:
+        """JPEG frames at target_fps, each annotated with the latest overlay"""
+        stats = self.stats["encode"]
+        interval = 1.0 / self.target_fps
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        sent = 0
+        next_at = time.monotonic()
+
+        while not self._stop.is_set():
+            seq, frame = self._frames.wait_newer(sent, timeout=0.5)
+            if seq == sent or frame is None:
+                continue
+            if sent:
+                stats.drop(seq - sent - 1)  # Captured, never streamed
+            sent = seq
+
+            frame = frame.copy()  # The inference thread may still read it
+            if self._overlay is not None:
+                self.draw(frame, self._overlay)
+            ret, buffer = cv2.imencode(".jpg", frame, params)
+            if ret:
+                stats.tick()
+                yield buffer.tobytes()
+
+            next_at = max(next_at + interval, time.monotonic())
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+    def status(self) -> Dict:
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+
+class FrameBroadcaster:
+    """
+    One pipeline shared by any number of async viewers
+
+    The first viewer starts a pipeline; its frames are encoded once on a
+    broadcast thread and handed to every viewer's bounded queue, where a
+    slow viewer loses its oldest frames rather than holding others back.
+    When the last viewer leaves the pipeline stops and on_stopped runs
+    (e.g. releasing the camera).
+
+    Args:
+        pipeline_factory: Opens the source and returns a new CameraPipeline
+        on_stopped: Called on the broadcast thread once a pipeline ends
+        wrap: Turns an encoded JPEG into the bytes sent to viewers
+        queue_size: Frames buffered per viewer
+    """
+
+    def __init__(
+        self,
+        pipeline_factory: Callable[[], CameraPipeline],
+        on_stopped: Callable[[], None],
+        wrap: Callable[[bytes], bytes] = lambda jpeg: jpeg,
+        queue_size: int = 2,
+    ):
+        self.pipeline_factory = pipeline_factory
+        self.on_stopped = on_stopped
+        self.wrap = wrap
+        self.queue_size = queue_size
+        self.dropped = 0  # Frames skipped for slow viewers
+        self._viewers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._pipeline: Optional[CameraPipeline] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._viewers)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Frames for one viewer until it disconnects or the source ends"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        await asyncio.to_thread(self._attach, queue, asyncio.get_running_loop())
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self._detach(queue)
+
+    def _attach(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        while True:
+            with self._lock:
+                if self._pipeline is not None and self._pipeline.running:
+                    self._viewers[queue] = loop
+                    return
+                stopping = self._thread
+                if stopping is None or not stopping.is_alive():
+                    self._start()
+                    self._viewers[queue] = loop
+                    return
+            # A stopping pipeline must finish releasing its source first
+            stopping.join()
+
+    def _start(self):
+        self._pipeline = self.pipeline_factory()
+        self._pipeline.start()
+        self._thread = threading.Thread(
+            target=self._broadcast,
+            args=(self._pipeline,),
+            name="camera-broadcast",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _detach(self, queue: asyncio.Queue):
+        # Runs on the event loop, so only signals the pipeline to stop
+        with self._lock:
+            self._viewers.pop(queue, None)
+            if not self._viewers and self._pipeline is not None:
+                self._pipeline.request_stop()
+
+    def _broadcast(self, pipeline: CameraPipeline):
+        try:
+            for jpeg in pipeline.frames():
+                chunk = self.wrap(jpeg)
+                with self._lock:
+                    viewers = list(self._viewers.items())
+                for queue, loop in viewers:
+                    loop.call_soon_threadsafe(self._offer, queue, chunk)
+        except Exception as e:
+            print(f"Streaming Error: {e}")
+        finally:
+            pipeline.stop()
+            with self._lock:
+                viewers = list(self._viewers.items())
+            for queue, loop in viewers:
+                loop.call_soon_threadsafe(self._offer, queue, None)
+            self.on_stopped()
+
+    def _offer(self, queue: asyncio.Queue, chunk: Optional[bytes]):
+        # On the viewer's loop; drop its oldest frame when it falls behind
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(chunk)
+
+    def status(self) -> Optional[Dict]:
+        pipeline = self._pipeline
+        if pipeline is None or not pipeline.running:
+            return None
+        return {
+            **pipeline.status(),
+            "viewers": {"count": len(self._viewers), "dropped": self.dropped},
+        }
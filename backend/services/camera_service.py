@@ -1,106 +1,216 @@
+"""
+Live camera recognition
+CameraManager owns every configured camera source; each gets its own
+capture / encode pipeline and viewer fan-out, while recognition for all
+of them runs on one shared thread pool over the process's face model.
+Fixed cameras can restrict detection to a region of interest and skip
+it entirely while nothing in that region moves.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
 import cv2
-import time
 import numpy as np
+
 import dependencies  # Global state sync
-from services.attendance_service import log_attendance
-from utils.database import load_all_students  # Import the loader
-
-
-def force_release_camera():
-    with dependencies.camera_lock:
-        dependencies.stream_active = False
-
-        if dependencies.camera is not None:
-            try:
-                dependencies.camera.release()
-                print("Camera released successfully")
-            except Exception as e:
-                print(f"Camera release error: {e}")
-            finally:
-                # Ensure the variable is reset even if release() throws an error
-                dependencies.camera = None
-
-        # A single short sleep is enough to let the OS hardware bus reset
-        time.sleep(0.5)
-        print("Camera system reset")
-
-
-def generate_video_frames():
-    """Generate video frames with face recognition using shared dependencies"""
-
-    print("Syncing known faces from database...")
-    dependencies.known_faces = load_all_students()
-
-    with dependencies.camera_lock:
-        if dependencies.camera is None or not dependencies.camera.isOpened():
-            dependencies.camera = cv2.VideoCapture(0)
-            dependencies.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        dependencies.stream_active = True
-
-    print(f"Stream started. Checking against {len(dependencies.known_faces)} faces.")
-
-    try:
-        while dependencies.stream_active:
-            with dependencies.camera_lock:
-                if dependencies.camera is None or not dependencies.stream_active:
-                    break
-                success, frame = dependencies.camera.read()
-
-            if not success:
-                print("Failed to grab frame")
-                break
-
-            faces = dependencies.face_app.get(frame)
-
-            for face in faces:
-                bbox = face.bbox.astype(int)
-                live_embedding = face.embedding
-                name, max_score = "Unknown", 0.0
-
-                # Recognition Loop
-                for known in dependencies.known_faces:
-                    # Cosine Similarity Calculation
-                    score = np.dot(live_embedding, known["embedding"]) / (
-                        np.linalg.norm(live_embedding)
-                        * np.linalg.norm(known["embedding"])
-                    )
-
-                    if score > 0.45 and score > max_score:
-                        max_score, name = score, known["name"]
-
-                color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
-
-                cv2.rectangle(frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 2)
-
-                label = f"{name} ({max_score:.2f})"
-                cv2.putText(
-                    frame,
-                    label,
-                    (bbox[0], bbox[1] - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    color,
-                    2,
-                )
+from config import settings
+from services.attendance_service import attendance_writer
+from services.camera_pipeline import CameraPipeline, FrameBroadcaster
+from services.camera_sources import CameraSource, DeviceSource, create_source
+from services.face_engine import embed_faces
+from services.face_tracker import FaceTracker
+from services.frame_gating import MotionGate, RegionOfInterest
+
+
+def recognize_faces(frame, tracker: FaceTracker, region=None, offset=(0, 0)):
+    """
+    Detect and track the faces of one frame
+
+    Detection runs on every analysed frame; each track is recognized when
+    it appears, then only at the tracker's refresh interval, with its
+    identity cached in between.
+
+    Args:
+        region, offset: Crop of the frame to detect in (see
+            RegionOfInterest.crop) and its top-left corner in the frame
+
+    Returns: (bbox, name, score) per face, name None if unknown
+    """
+    face_app = dependencies.get_face_app()
+    bboxes, kpss = face_app.det_model.detect(
+        frame if region is None else region, max_num=0, metric="default"
+    )
+    if region is not None and len(bboxes):
+        bboxes[:, :4] += [offset[0], offset[1], offset[0], offset[1]]
+        kpss = kpss + offset
+    tracks = tracker.update(bboxes)
+
+    # Only new tracks and those due a refresh are embedded and matched
+    pending = [i for i, t in enumerate(tracks) if tracker.needs_recognition(t)]
+    if pending:
+        embeddings = embed_faces(face_app, frame, kpss[pending])
+        match_ids, match_names, match_scores = dependencies.face_gallery.match(
+            list(embeddings), k=1, threshold=settings.RECOGNITION_THRESHOLD
+        )
+        for row, i in enumerate(pending):
+            name, score = None, 0.0
+            if match_names.shape[1] and match_names[row, 0] is not None:
+                name = match_names[row, 0]
+                score = float(match_scores[row, 0])
+            tracker.identify(tracks[i], name, score)
+            if name is not None:
+                attendance_writer.log(match_ids[row, 0])
+
+    return [(track.bbox.astype(int), track.name, track.score) for track in tracks]
+
+
+def draw_faces(frame, faces):
+    """Draw recognize_faces results onto a frame"""
+    for bbox, name, score in faces:
+        color = (0, 255, 0) if name else (0, 0, 255)
+
+        cv2.rectangle(frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 2)
+
+        label = f"{name or 'Unknown'} ({score:.2f})"
+        cv2.putText(
+            frame,
+            label,
+            (bbox[0], bbox[1] - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            color,
+            2,
+        )
+
+
+def mjpeg_part(jpeg: bytes) -> bytes:
+    return b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+
+
+class CameraManager:
+    """
+    Named camera sources, each shared by all of its viewers
+
+    Args:
+        sources: camera_id -> source spec (see create_source)
+        inference_workers: Threads running recognition across all cameras
+    """
+
+    def __init__(self, sources: Dict[str, str], inference_workers: int = 2):
+        self._pool = ThreadPoolExecutor(
+            max_workers=inference_workers, thread_name_prefix="camera-inference"
+        )
+        self._sources: Dict[str, CameraSource] = {}
+        self._broadcasters: Dict[str, FrameBroadcaster] = {}
+        self._gates: Dict[str, MotionGate] = {}
+        for camera_id, spec in sources.items():
+            source = create_source(spec)
+            self._sources[camera_id] = source
+            self._broadcasters[camera_id] = FrameBroadcaster(
+                self._pipeline_factory(camera_id, source),
+                source.release,
+                wrap=mjpeg_part,
+                queue_size=settings.CAMERA_VIEWER_QUEUE_SIZE,
+            )
 
-                if name != "Unknown":
-                    log_attendance(name)
+    def __contains__(self, camera_id: str) -> bool:
+        return camera_id in self._sources
 
-            ret, buffer = cv2.imencode(".jpg", frame)
-            if not ret:
-                continue
+    @property
+    def camera_ids(self) -> List[str]:
+        return list(self._sources)
 
-            yield (
-                b"--frame\r\n"
-                b"Content-Type: image/jpeg\r\n\r\n" + buffer.tobytes() + b"\r\n"
-            )
+    @property
+    def default_camera(self) -> Optional[str]:
+        return next(iter(self._sources), None)
 
-            # Small delay to prevent CPU maxing out
-            time.sleep(0.01)
+    def _pipeline_factory(self, camera_id: str, source: CameraSource):
+        def start() -> CameraPipeline:
+            source.open()
+            print(
+                f"Stream {camera_id} started. Checking against "
+                f"{len(dependencies.face_gallery)} faces."
+            )
+            tracker = FaceTracker(
+                iou_threshold=settings.TRACK_IOU_THRESHOLD,
+                max_missed=settings.TRACK_MAX_MISSED,
+                refresh_frames=settings.TRACK_REFRESH_FRAMES,
+                retry_frames=settings.TRACK_RETRY_FRAMES,
+                confident_score=settings.TRACK_CONFIDENT_SCORE,
+            )
+            roi = None
+            if settings.CAMERA_ROIS.get(camera_id):
+                roi = RegionOfInterest(settings.CAMERA_ROIS[camera_id])
+            gate = None
+            if settings.CAMERA_MOTION_THRESHOLD > 0:
+                gate = MotionGate(
+                    settings.CAMERA_MOTION_THRESHOLD,
+                    hold_frames=settings.CAMERA_MOTION_HOLD_FRAMES,
+                )
+                self._gates[camera_id] = gate
+
+            def analyse(frame):
+                region, offset = roi.crop(frame) if roi else (None, (0, 0))
+                if gate is not None and not gate.update(
+                    frame if region is None else region
+                ):
+                    # Nothing moves: no detection, and stale tracks age out
+                    tracker.update(np.zeros((0, 4)))
+                    return []
+                return self._pool.submit(
+                    recognize_faces, frame, tracker, region, offset
+                ).result()
+
+            return CameraPipeline(
+                source.read,
+                analyse,
+                draw_faces,
+                target_fps=settings.CAMERA_STREAM_FPS,
+                jpeg_quality=settings.CAMERA_JPEG_QUALITY,
+            )
 
-    except GeneratorExit:
-        print("Web client disconnected from stream")
-    except Exception as e:
-        print(f"Streaming Error: {e}")
-    finally:
-        force_release_camera()
+        return start
+
+    def stream(self, camera_id: str):
+        """
+        MJPEG parts of one camera for one viewer
+
+        Capture, recognition and JPEG encoding run once per camera as
+        separate stages (see CameraPipeline), so a slow recognition frame
+        never stalls capture, and a viewer disconnecting never stops the
+        others' stream.
+        """
+        return self._broadcasters[camera_id].stream()
+
+    def release(self, camera_id: str):
+        """Release a camera, ending its stream for every viewer"""
+        self._sources[camera_id].release()
+
+    def release_devices(self):
+        """Release local capture devices (network and file sources keep running)"""
+        for source in self._sources.values():
+            if isinstance(source, DeviceSource):
+                source.release()
+
+    def release_all(self):
+        for source in self._sources.values():
+            source.release()
+        self._pool.shutdown(wait=False)
+
+    def status(self, camera_id: str) -> Dict:
+        """Source, open state, viewers and per-stage throughput of a camera"""
+        stages = self._broadcasters[camera_id].status()
+        if stages is not None and camera_id in self._gates:
+            stages["motion_gate"] = self._gates[camera_id].as_dict()
+        return {
+            "camera_id": camera_id,
+            "source": self._sources[camera_id].spec,
+            "active": self._sources[camera_id].is_open,
+            "stages": stages,
+        }
+
+
+camera_manager = CameraManager(
+    settings.CAMERA_SOURCES, inference_workers=settings.CAMERA_INFERENCE_WORKERS
+)
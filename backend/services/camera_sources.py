@@ -0,0 +1,155 @@
+"""
+Camera frame sources
+A source spec is a device index ("0"), a stream URL (rtsp://, http://)
+or a video file path; create_source picks the matching class. read() is
+called from a single capture thread, release() from any thread.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import cv2
+
+
+class CameraSource(ABC):
+    """Base source around one cv2.VideoCapture"""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self._capture = None
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _open_capture(self) -> cv2.VideoCapture:
+        """Create the underlying capture (lock held)"""
+
+    @property
+    def is_open(self) -> bool:
+        return self._capture is not None
+
+    def open(self):
+        """Open the capture if it isn't already"""
+        with self._lock:
+            if self._capture is not None and self._capture.isOpened():
+                return
+            self._capture = self._open_capture()
+            if not self._capture.isOpened():
+                print(f"❌ Could not open camera source {self.spec}")
+
+    def read(self):
+        """Returns: (success, frame); fails once released"""
+        with self._lock:
+            if self._capture is None:
+                return False, None
+            return self._capture.read()
+
+    def release(self):
+        """Release the capture; safe to call repeatedly"""
+        with self._lock:
+            if self._capture is None:
+                return
+            try:
+                self._capture.release()
+                print(f"Camera {self.spec} released successfully")
+            except Exception as e:
+                print(f"Camera release error: {e}")
+            finally:
+                # Reset even if release() throws an error
+                self._capture = None
+
+
+class DeviceSource(CameraSource):
+    """Local capture device by index"""
+
+    def _open_capture(self) -> cv2.VideoCapture:
+        capture = cv2.VideoCapture(int(self.spec))
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+
+    def release(self):
+        was_open = self.is_open
+        super().release()
+        if was_open:
+            # A single short sleep is enough to let the OS hardware bus reset
+            time.sleep(0.5)
+
+
+class StreamSource(CameraSource):
+    """
+    Network stream (RTSP / HTTP), reconnecting after dropped reads
+
+    Args:
+        reconnect_attempts: Reopens tried before a read counts as failed
+    """
+
+    def __init__(self, spec: str, reconnect_attempts: int = 3):
+        super().__init__(spec)
+        self.reconnect_attempts = reconnect_attempts
+
+    def _open_capture(self) -> cv2.VideoCapture:
+        capture = cv2.VideoCapture(self.spec, cv2.CAP_FFMPEG)
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+
+    def read(self):
+        success, frame = super().read()
+        attempt = 0
+        while not success and self.is_open and attempt < self.reconnect_attempts:
+            attempt += 1
+            print(f"⚠️ Stream {self.spec} dropped, reconnecting ({attempt})")
+            time.sleep(attempt)
+            with self._lock:
+                if self._capture is None:  # Released meanwhile
+                    break
+                self._capture.release()
+                self._capture = self._open_capture()
+            success, frame = super().read()
+        return success, frame
+
+
+class FileSource(CameraSource):
+    """
+    Video file played back at its own frame rate, for testing and demos
+
+    Args:
+        loop: Restart from the first frame at the end of the file
+    """
+
+    def __init__(self, spec: str, loop: bool = True):
+        super().__init__(spec)
+        self.loop = loop
+        self._interval = 0.0
+        self._next_at = 0.0
+
+    def _open_capture(self) -> cv2.VideoCapture:
+        capture = cv2.VideoCapture(self.spec)
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        self._interval = 1.0 / fps
+        self._next_at = time.monotonic()
+        return capture
+
+    def read(self):
+        delay = self._next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_at = max(self._next_at + self._interval, time.monotonic())
+
+        success, frame = super().read()
+        if not success and self.loop:
+            with self._lock:
+                if self._capture is None:
+                    return False, None
+                self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = super().read()
+        return success, frame
+
+
+def create_source(spec: str) -> CameraSource:
+    """Source for a device index, stream URL or file path"""
+    spec = str(spec)
+    if spec.isdigit():
+        return DeviceSource(spec)
+    if "://" in spec:
+        return StreamSource(spec)
+    return FileSource(spec)
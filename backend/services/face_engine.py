@@ -0,0 +1,304 @@
+"""
+Face model construction and image-to-embedding inference
+Imports nothing from dependencies.py, so inference worker processes can
+build their own model without opening MinIO/Postgres clients or loading
+the API process's model a second time
+"""
+
+import base64
+import hashlib
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import onnxruntime
+from insightface.app import FaceAnalysis
+from insightface.utils import face_align
+
+# Execution providers and FaceAnalysis ctx_id per INFERENCE_DEVICE
+DEVICE_PROVIDERS = {
+    "cpu": (["CPUExecutionProvider"], -1),
+    "cuda": (["CUDAExecutionProvider", "CPUExecutionProvider"], 0),
+}
+
+# Extra model-pack modules a feature needs on top of FACE_MODULES
+FEATURE_MODULES = {
+    "liveness": ("landmark_2d_106", "landmark_3d_68"),  # blink EAR, head pose
+    "demographics": ("genderage",),
+}
+
+
+def face_modules(modules: Sequence[str], features: Sequence[str] = ()) -> List[str]:
+    """
+    Modules to load for the configured features
+
+    Raises:
+        ValueError: Unknown feature name
+    """
+    wanted = list(modules)
+    for feature in features:
+        if feature not in FEATURE_MODULES:
+            raise ValueError(f"Unknown face feature '{feature}'")
+        wanted.extend(m for m in FEATURE_MODULES[feature] if m not in wanted)
+    return wanted
+
+
+def session_options(
+    intra_op_threads: int = 0, inter_op_threads: int = 0
+) -> onnxruntime.SessionOptions:
+    """
+    ONNX Runtime options for the face models
+
+    Args:
+        intra_op_threads: Threads inside one operator; 0 keeps the runtime
+            default (one per core)
+        inter_op_threads: Threads running independent graph branches; > 1
+            switches to parallel execution
+    """
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = (
+        onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        options.inter_op_num_threads = inter_op_threads
+        if inter_op_threads > 1:
+            options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+    return options
+
+
+def open_session(
+    model_file: str,
+    providers: Sequence[str],
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    optimized_model_dir: str = "",
+) -> onnxruntime.InferenceSession:
+    """
+    Open one model with full graph optimisation
+
+    With optimized_model_dir, the optimised graph is saved on first load
+    (keyed by source path, size, mtime and providers, as the saved graph may
+    hold hardware-specific kernels) and later loads skip re-optimising it.
+    """
+    options = session_options(intra_op_threads, inter_op_threads)
+    if not optimized_model_dir:
+        return onnxruntime.InferenceSession(
+            model_file, sess_options=options, providers=list(providers)
+        )
+
+    stat = os.stat(model_file)
+    key = hashlib.sha1(
+        f"{os.path.abspath(model_file)}|{stat.st_size}|{stat.st_mtime_ns}|"
+        f"{','.join(providers)}|{onnxruntime.__version__}".encode()
+    ).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(model_file))[0]
+    cached = os.path.join(optimized_model_dir, f"{stem}-{key}.onnx")
+
+    if os.path.exists(cached):
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+        )
+        return onnxruntime.InferenceSession(
+            cached, sess_options=options, providers=list(providers)
+        )
+
+    # Workers start together; each writes its own file, then renames
+    os.makedirs(optimized_model_dir, exist_ok=True)
+    tmp_path = f"{cached}.{os.getpid()}.tmp"
+    options.optimized_model_filepath = tmp_path
+    session = onnxruntime.InferenceSession(
+        model_file, sess_options=options, providers=list(providers)
+    )
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, cached)
+    return session
+
+
+def create_face_app(
+    model_name: str,
+    det_size: Tuple[int, int],
+    providers: Sequence[str],
+    ctx_id: int = 0,
+    intra_op_threads: int = 0,
+    modules: Optional[Sequence[str]] = ("detection", "recognition"),
+    inter_op_threads: int = 0,
+    optimized_model_dir: str = "",
+) -> FaceAnalysis:
+    """
+    Load and prepare a FaceAnalysis model pack
+
+    Args:
+        model_name: Pack under ~/.insightface/models, e.g. buffalo_l or the
+            buffalo_l_int8 pack written by scripts/quantize_models.py
+        modules: Task names to keep (see face_modules); None loads the
+            whole pack, e.g. buffalo_l's landmark and genderage models
+            which FaceAnalysis.get would otherwise run on every face
+        intra_op_threads, inter_op_threads, optimized_model_dir:
+            See session_options / open_session
+    """
+    app = FaceAnalysis(
+        name=model_name,
+        allowed_modules=None if modules is None else list(modules),
+        providers=list(providers),
+    )
+
+    # FaceAnalysis does not forward SessionOptions, so reopen each model's
+    # session on the same file with the tuned options
+    for model in app.models.values():
+        model.session = open_session(
+            model.model_file,
+            providers,
+            intra_op_threads,
+            inter_op_threads,
+            optimized_model_dir,
+        )
+
+    app.prepare(ctx_id=ctx_id, det_size=det_size)
+    return app
+
+
+# JPEG start-of-frame markers carrying the image size (not DHT/JPG/DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# JPEG DCT-domain downscaling, coarsest first
+REDUCED_DECODES = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def base64_to_buffer(image_data: str) -> np.ndarray:
+    """Raw encoded bytes of a data-URL / base64 image"""
+    if "," in image_data:
+        image_data = image_data.split(",")[1]
+    return np.frombuffer(base64.b64decode(image_data), np.uint8)
+
+
+def jpeg_size(buffer: np.ndarray) -> Optional[Tuple[int, int]]:
+    """(height, width) from a JPEG header, or None if not a JPEG"""
+    data = buffer.tobytes() if len(buffer) < 65536 else buffer[:65536].tobytes()
+    if data[:2] != b"\xff\xd8":
+        return None
+
+    pos = 2
+    while pos + 9 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            return (
+                int.from_bytes(data[pos + 5 : pos + 7], "big"),
+                int.from_bytes(data[pos + 7 : pos + 9], "big"),
+            )
+        pos += 2 + int.from_bytes(data[pos + 2 : pos + 4], "big")
+    return None
+
+
+def decode_image(buffer: np.ndarray, min_side: int = 0):
+    """
+    Decode to BGR, downscaled while decoding where possible
+
+    Args:
+        min_side: Smallest long side the result may have; 0 decodes at
+            full resolution
+
+    Returns:
+        (img, scale) with scale = original pixels per decoded pixel; img
+        is None if the bytes are not an image
+    """
+    size = jpeg_size(buffer) if min_side else None
+    if size is not None:
+        for scale, flag in REDUCED_DECODES:
+            if max(size) / scale >= min_side:
+                return cv2.imdecode(buffer, flag), scale
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR), 1
+
+
+def extract_embeddings(
+    app: FaceAnalysis, images: List[str], decode_min_side: int = 0
+) -> List[Tuple]:
+    """
+    Detect the first face in each base64 image and embed them together
+
+    Detection runs per image (sizes differ) on a reduced-size decode, then
+    the aligned crops of all images go through the recognition model in a
+    single batched call. A face too small in the reduced image for the
+    recognizer's input is aligned from the full-resolution decode instead;
+    norm_crop only warps the crop, never the whole image.
+
+    Args:
+        decode_min_side: Long side to decode selfies down to (see
+            decode_image); 0 keeps full resolution
+
+    Returns: One (success, embedding, error_message) per image
+    """
+    recognizer = app.models["recognition"]
+    results = [None] * len(images)
+    crops = []
+    owners = []
+
+    for i, image_data in enumerate(images):
+        try:
+            buffer = base64_to_buffer(image_data)
+            img, scale = decode_image(buffer, decode_min_side)
+            if img is None:
+                results[i] = (False, None, "Invalid image")
+                continue
+
+            bboxes, kpss = app.det_model.detect(img, max_num=0, metric="default")
+            if bboxes.shape[0] == 0:
+                results[i] = (False, None, "No face detected")
+                continue
+
+            landmarks = kpss[0]
+            face_width = bboxes[0, 2] - bboxes[0, 0]
+            if scale > 1 and face_width < recognizer.input_size[0]:
+                img, _ = decode_image(buffer)
+                landmarks = landmarks * scale
+
+            crops.append(
+                face_align.norm_crop(
+                    img, landmark=landmarks, image_size=recognizer.input_size[0]
+                )
+            )
+            owners.append(i)
+
+        except Exception as e:
+            results[i] = (False, None, str(e))
+
+    if crops:
+        try:
+            embeddings = recognizer.get_feat(crops)
+            for i, embedding in zip(owners, embeddings):
+                results[i] = (True, embedding.tolist(), None)
+        except Exception as e:
+            for i in owners:
+                results[i] = (False, None, str(e))
+
+    return results
+
+
+def embed_faces(app: FaceAnalysis, img: np.ndarray, landmarks) -> np.ndarray:
+    """Embeddings of the faces at the given 5-point landmarks, one batch"""
+    recognizer = app.models["recognition"]
+    crops = [
+        face_align.norm_crop(img, landmark=kps, image_size=recognizer.input_size[0])
+        for kps in landmarks
+    ]
+    return recognizer.get_feat(crops)
+
+
+def extract_embedding(app: FaceAnalysis, image_data: str):
+    """
+    Detect the first face in a base64 image and embed it
+
+    Returns: (success, embedding, error_message)
+    """
+    return extract_embeddings(app, [image_data])[0]
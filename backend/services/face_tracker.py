@@ -0,0 +1,126 @@
+"""
+Face tracking for the live camera stream
+Detections are linked frame to frame by box overlap so a seated student
+keeps one track id; recognition then runs per track (when it appears and
+at a slow refresh) instead of per face per frame.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (n, 4) and (m, 4) x1, y1, x2, y2 boxes"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class Track:
+    """One face followed across frames, with its cached identity"""
+
+    __slots__ = ("track_id", "bbox", "missed", "name", "score", "recognized_at")
+
+    def __init__(self, track_id: int, bbox: np.ndarray):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.missed = 0
+        self.name: Optional[str] = None
+        self.score = 0.0
+        self.recognized_at: Optional[int] = None  # Frame of last recognition
+
+
+class FaceTracker:
+    """
+    Greedy IoU tracker with per-track identity caching
+
+    Args:
+        iou_threshold: Minimum overlap to continue a track
+        max_missed: Frames a track survives without a detection
+        refresh_frames: Frames between re-recognitions of a confident track
+        retry_frames: Frames between re-recognitions of an unknown or
+            low-confidence track
+        confident_score: Match score at or above which a track counts as
+            confident
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_missed: int = 10,
+        refresh_frames: int = 60,
+        retry_frames: int = 5,
+        confident_score: float = 0.55,
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.refresh_frames = refresh_frames
+        self.retry_frames = retry_frames
+        self.confident_score = confident_score
+        self.frame = 0
+        self._tracks: List[Track] = []
+        self._next_id = 1
+
+    def update(self, bboxes: np.ndarray) -> List[Track]:
+        """
+        Advance one frame
+
+        Args:
+            bboxes: (n, 4+) detections of this frame; extra columns ignored
+
+        Returns: The track of each detection, in detection order
+        """
+        self.frame += 1
+        boxes = np.asarray(bboxes, dtype=np.float32)[:, :4]
+        assigned: List[Optional[Track]] = [None] * len(boxes)
+
+        if self._tracks and len(boxes):
+            previous = np.stack([track.bbox for track in self._tracks])
+            overlap = iou_matrix(previous, boxes)
+            # Best-overlapping pairs first; each track and box used once
+            for flat in np.argsort(-overlap, axis=None):
+                t, d = np.unravel_index(flat, overlap.shape)
+                if overlap[t, d] < self.iou_threshold:
+                    break
+                track = self._tracks[t]
+                if assigned[d] is None and track.missed >= 0:
+                    assigned[d] = track
+                    track.missed = -1  # Matched this frame
+
+        for track in self._tracks:
+            track.missed = 0 if track.missed < 0 else track.missed + 1
+
+        for d, box in enumerate(boxes):
+            if assigned[d] is None:
+                assigned[d] = Track(self._next_id, box)
+                self._next_id += 1
+                self._tracks.append(assigned[d])
+            else:
+                assigned[d].bbox = box
+
+        self._tracks = [t for t in self._tracks if t.missed <= self.max_missed]
+        return assigned
+
+    def needs_recognition(self, track: Track) -> bool:
+        """New tracks, and known ones whose refresh interval has passed"""
+        if track.recognized_at is None:
+            return True
+        confident = track.name is not None and track.score >= self.confident_score
+        interval = self.refresh_frames if confident else self.retry_frames
+        return self.frame - track.recognized_at >= interval
+
+    def identify(self, track: Track, name: Optional[str], score: float):
+        """Cache a recognition result on the track"""
+        track.name = name
+        track.score = score
+        track.recognized_at = self.frame
+
+    def __len__(self) -> int:
+        return len(self._tracks)
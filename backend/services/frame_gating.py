@@ -0,0 +1,110 @@
+"""
+Cheap per-frame gates in front of face detection for fixed cameras
+RegionOfInterest crops each frame to a configured polygon (e.g. the
+doorway) and MotionGate skips detection while nothing in it moves.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+class RegionOfInterest:
+    """
+    Polygon of the frame detection should look at
+
+    Args:
+        polygon: (x, y) vertices as fractions of frame width / height, so
+            the same setting works at any capture resolution
+    """
+
+    def __init__(self, polygon: Sequence[Sequence[float]]):
+        self.polygon = np.asarray(polygon, dtype=np.float32)
+        if self.polygon.ndim != 2 or len(self.polygon) < 3:
+            raise ValueError("ROI polygon needs at least 3 (x, y) points")
+        self._shape = None
+        self._box = None
+        self._mask = None
+
+    def _prepare(self, shape):
+        height, width = shape[:2]
+        points = np.round(self.polygon * [width, height]).astype(np.int32)
+        x, y, w, h = cv2.boundingRect(points)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, width), min(y + h, height)
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        cv2.fillPoly(mask, [points - [x0, y0]], 255)
+        self._shape = shape
+        self._box = (x0, y0, x1, y1)
+        # No mask needed when the polygon is its bounding rectangle
+        self._mask = None if mask.all() else mask
+
+    def crop(self, frame: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        Returns:
+            (region, (x0, y0)): the polygon's bounding box with pixels
+            outside the polygon blacked out, and its offset in the frame
+        """
+        if frame.shape != self._shape:
+            self._prepare(frame.shape)
+        x0, y0, x1, y1 = self._box
+        region = frame[y0:y1, x0:x1]
+        if self._mask is not None:
+            region = cv2.bitwise_and(region, region, mask=self._mask)
+        return region, (x0, y0)
+
+
+class MotionGate:
+    """
+    Frame differencing on a small grayscale copy
+
+    Args:
+        threshold: Fraction of pixels that must change to count as motion
+        hold_frames: Frames to keep passing after the last motion, so a
+            face pausing in the doorway is still detected
+        width: Width the frame is downscaled to before differencing
+        pixel_delta: Grey-level change that counts a pixel as changed
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.002,
+        hold_frames: int = 15,
+        width: int = 160,
+        pixel_delta: int = 25,
+    ):
+        self.threshold = threshold
+        self.hold_frames = hold_frames
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self.checked = 0
+        self.skipped = 0
+        self._previous: Optional[np.ndarray] = None
+        self._hold = 0
+
+    def update(self, frame: np.ndarray) -> bool:
+        """True if detection should run on this frame"""
+        self.checked += 1
+        height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        previous, self._previous = self._previous, small
+        if previous is None or previous.shape != small.shape:
+            moving = True
+        else:
+            changed = cv2.absdiff(previous, small) > self.pixel_delta
+            moving = changed.mean() >= self.threshold
+
+        if moving:
+            self._hold = self.hold_frames
+        elif self._hold > 0:
+            self._hold -= 1
+        else:
+            self.skipped += 1
+            return False
+        return True
+
+    def as_dict(self) -> Dict:
+        return {"checked": self.checked, "skipped": self.skipped}
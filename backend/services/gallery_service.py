@@ -0,0 +1,805 @@
+"""
+Face galleries
+FaceGallery keeps every enrolled template in one contiguous, pre-normalized
+matrix so matching any number of live faces is a single matrix multiply;
+DatabaseGallery runs the same top-k search inside Postgres with pgvector
+"""
+
+import threading
+from collections import Counter, namedtuple
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.ann_index import create_ann_index
+
+EMBEDDING_DIM = 512
+
+# Gallery rows are addressed by slot, one slot per template. A student's
+# templates occupy a contiguous run of slots: group_start/group_size give
+# every slot the first slot and length of its run, and ids/names repeat
+# the student on each of them. Removed students leave dead slots
+# (alive=False) so ANN labels stay valid until the gallery is compacted.
+# Slots below len(base) read from the base matrix (possibly a read-only
+# memmap shared between workers), later slots from the private tail buffer.
+# codes/scales hold the optional compact copy of every slot. index is the
+# ANN index over these slots (or None), published with them so a reader
+# never pairs a compacted state with an index labelled by old slots.
+GalleryState = namedtuple(
+    "GalleryState",
+    [
+        "base",
+        "tail",
+        "ids",
+        "names",
+        "alive",
+        "codes",
+        "scales",
+        "group_start",
+        "group_size",
+        "index",
+    ],
+)
+
+GALLERY_PRECISIONS = ("float32", "float16", "int8")
+
+# How template scores combine into one score per student
+TEMPLATE_AGGREGATIONS = ("max", "top2_mean")
+
+# Rows decoded per step when scoring compact codes, bounds temp memory
+COMPACT_SCORE_CHUNK = 4096
+
+
+def encode_compact(vectors: np.ndarray, precision: str):
+    """
+    Compress normalized embeddings
+
+    Returns:
+        (codes, scales): float16 codes with unit scales, or symmetric int8
+        codes with a per-vector scale so codes * scale ~= vector
+    """
+    if precision == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def normalize_embeddings(embeddings) -> np.ndarray:
+    """
+    L2-normalize a batch of embeddings
+
+    Returns:
+        float32 matrix of shape (n, dim) with unit-length rows
+    """
+    matrix = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def aggregate_scores(
+    scores: np.ndarray, starts: np.ndarray, aggregation: str
+) -> np.ndarray:
+    """
+    Combine per-template scores into per-student scores
+
+    Args:
+        scores: (q, n) template scores, each student's templates contiguous
+        starts: Sorted first column of every student, starting at 0
+        aggregation: 'max' or 'top2_mean' (mean of the two best templates;
+            students with a single template keep its score)
+
+    Returns:
+        (q, len(starts)) student scores
+    """
+    best = np.maximum.reduceat(scores, starts, axis=1)
+    if aggregation == "max":
+        return best
+
+    sizes = np.diff(np.append(starts, scores.shape[1]))
+    rest = np.where(scores == np.repeat(best, sizes, axis=1), -np.inf, scores)
+    second = np.maximum.reduceat(rest, starts, axis=1)
+    return np.where(np.isfinite(second), (best + second) / 2, best)
+
+
+class FaceGallery:
+    """
+    Enrolled face templates held as a pre-normalized float32 matrix with
+    parallel arrays of student UUIDs and names.
+
+    A student can have several templates (e.g. captured under different
+    lighting). They are packed next to each other, every query is scored
+    against all of them, and the per-template scores are aggregated into
+    one score per student before the top-k students are picked.
+
+    The bulk of the rows sit in a base matrix that is never written after
+    load, so it can be a read-only memmap of the on-disk snapshot. Students
+    added later go to a preallocated tail buffer, and the published
+    GalleryState is a view of the filled slots. Adding a student writes the
+    next tail slots (invisible to readers of the old view) and then swaps in
+    a longer view; removing one flips its alive flags. When the tail fills
+    up, or too many slots are dead, new buffers are built on the side and
+    swapped in atomically, so readers never see a half-updated gallery.
+    Compacting a memory-mapped gallery writes the compacted rows through
+    compact_store (a new snapshot) and maps them, so they stay shared.
+
+    With precision float16 or int8, exact search scores a compact in-RAM
+    copy first and re-ranks the best rerank_candidates students against the
+    float32 rows. The float32 rows are kept, so this only saves memory when
+    the base is the memory-mapped snapshot: then only those candidate rows
+    are ever paged in. With an in-RAM base the compact copy adds to it.
+    numpy has no fast float16 matmul, so float16 is several times slower
+    than float32; int8 is the mode to use.
+
+    When an ANN backend is configured and the gallery holds at least
+    ann_min_size students, matching goes through the ANN index; smaller
+    galleries use exact search.
+    """
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        ann_backend: Optional[str] = None,
+        ann_min_size: int = 0,
+        ann_params: Optional[Dict] = None,
+        initial_capacity: int = 1024,
+        compact_ratio: float = 0.25,
+        precision: str = "float32",
+        rerank_candidates: int = 32,
+        aggregation: str = "max",
+    ):
+        if precision not in GALLERY_PRECISIONS:
+            raise ValueError(f"Unknown gallery precision '{precision}'")
+        if aggregation not in TEMPLATE_AGGREGATIONS:
+            raise ValueError(f"Unknown template aggregation '{aggregation}'")
+
+        self.dim = dim
+        self.precision = precision
+        self.rerank_candidates = rerank_candidates
+        self.aggregation = aggregation
+        self.ann_backend = ann_backend
+        self.ann_min_size = ann_min_size
+        self.ann_params = ann_params or {}
+        self.initial_capacity = initial_capacity
+        self.compact_ratio = compact_ratio
+        self.high_water_mark = 0  # Last gallery_changes.seq applied
+        # Called as compact_store(ids, names, matrix, high_water_mark) to
+        # persist a compacted base and return it memory-mapped; None keeps
+        # compacted rows in private RAM
+        self.compact_store = None
+        self._write_lock = threading.Lock()
+        self._live_count = 0
+        self._live_templates = 0
+        # student_id -> (first slot, template count)
+        self._slots_by_id: Dict[str, Tuple[int, int]] = {}
+        self._base = np.empty((0, dim), dtype=np.float32)
+        self._buffers = self._allocate(0, 0)
+        self._state = self._view(0)
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def __contains__(self, student_id) -> bool:
+        return str(student_id) in self._slots_by_id
+
+    def _allocate(self, slots: int, tail_rows: int) -> GalleryState:
+        """Empty backing buffers: tail_rows embeddings, slots of metadata"""
+        compact_slots = slots if self.precision != "float32" else 0
+        code_dtype = np.int8 if self.precision == "int8" else np.float16
+        return GalleryState(
+            self._base,
+            np.zeros((tail_rows, self.dim), dtype=np.float32),
+            np.full(slots, None, dtype=object),
+            np.full(slots, None, dtype=object),
+            np.zeros(slots, dtype=bool),
+            np.zeros((compact_slots, self.dim), dtype=code_dtype),
+            np.ones(compact_slots, dtype=np.float32),
+            np.zeros(slots, dtype=np.int64),
+            np.zeros(slots, dtype=np.int64),
+            None,
+        )
+
+    def _view(self, size: int, index=None) -> GalleryState:
+        """State exposing the first size slots of the backing buffers"""
+        buffers = self._buffers
+        return GalleryState(
+            buffers.base,
+            buffers.tail[: size - len(buffers.base)],
+            *(buffer[:size] for buffer in buffers[2:-1]),
+            index,
+        )
+
+    def _replace_contents(self, base: np.ndarray, ids, names):
+        """
+        Swap in base as the whole gallery with an empty tail (lock held)
+
+        Rows of the same student must be adjacent.
+        """
+        size = len(ids)
+        self._base = base
+        buffers = self._allocate(size + self.initial_capacity, self.initial_capacity)
+        buffers.ids[:size] = ids
+        buffers.names[:size] = names
+        buffers.alive[:size] = True
+        if self.precision != "float32":
+            for start in range(0, size, COMPACT_SCORE_CHUNK):
+                stop = min(start + COMPACT_SCORE_CHUNK, size)
+                buffers.codes[start:stop], buffers.scales[start:stop] = (
+                    encode_compact(np.asarray(base[start:stop]), self.precision)
+                )
+
+        starts = _group_starts(buffers.ids[:size])
+        sizes = np.diff(np.append(starts, size))
+        buffers.group_start[:size] = np.repeat(starts, sizes)
+        buffers.group_size[:size] = np.repeat(sizes, sizes)
+
+        self._buffers = buffers
+        self._slots_by_id = {
+            buffers.ids[start]: (int(start), int(count))
+            for start, count in zip(starts, sizes)
+        }
+        self._live_count = len(starts)
+        self._live_templates = size
+        # Build the index before publishing: state and index swap together
+        state = self._view(size)
+        self._state = state._replace(index=self._build_index(state))
+
+    def load(self, students: List[Dict]):
+        """
+        Replace the gallery contents and rebuild the ANN index
+
+        Args:
+            students: Rows with 'id', 'name' and 'embedding' keys, where
+                'embedding' is one template or a (t, dim) stack of them
+        """
+        ids = []
+        names = []
+        templates = []
+        for student in students:
+            rows = np.asarray(student["embedding"], dtype=np.float32).reshape(
+                -1, self.dim
+            )
+            ids.extend([student["id"]] * len(rows))
+            names.extend([student["name"]] * len(rows))
+            templates.append(rows)
+
+        self.load_arrays(
+            ids,
+            names,
+            np.concatenate(templates) if templates else np.empty((0, self.dim)),
+        )
+
+    def load_arrays(self, ids, names, matrix: np.ndarray, normalized: bool = False):
+        """
+        Replace the gallery contents from parallel arrays
+
+        Args:
+            ids: Student id of every row; a student with several templates
+                repeats its id, ideally on adjacent rows (otherwise the rows
+                are regrouped with a copy)
+            matrix: (n, dim) embeddings, normalized in place unless
+                normalized=True, in which case it is used as-is without a
+                copy (e.g. a read-only memmap)
+        """
+        ids = np.array([str(student_id) for student_id in ids], dtype=object)
+        names = np.array(list(names), dtype=object)
+        if not normalized:
+            matrix = np.array(matrix, dtype=np.float32).reshape(-1, self.dim)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+
+        if len(_group_starts(ids)) != len(set(ids)):
+            order = np.argsort(ids, kind="stable")
+            ids, names, matrix = ids[order], names[order], matrix[order]
+
+        with self._write_lock:
+            self._replace_contents(matrix, ids, names)
+
+    def add(self, student_id, name: str, embedding):
+        """
+        Append one student's templates in amortized O(1); re-adding a known
+        id replaces all of its templates, and replaying an unchanged set is
+        a no-op
+
+        Args:
+            embedding: One template or a (t, dim) stack of them
+        """
+        vectors = normalize_embeddings(embedding)
+        student_id = str(student_id)
+        count = len(vectors)
+
+        with self._write_lock:
+            current = self._slots_by_id.get(student_id)
+            if current is not None:
+                start, current_count = current
+                if (
+                    current_count == count
+                    and self._state.names[start] == name
+                    and np.allclose(
+                        self.vectors(self._state, np.arange(start, start + count)),
+                        vectors,
+                    )
+                ):
+                    return
+            self._discard(student_id)
+
+            start = len(self._state.ids)
+            if start + count > len(self._buffers.ids):
+                self._grow(count)
+
+            slots = np.arange(start, start + count)
+            self._buffers.tail[slots - len(self._base)] = vectors
+            self._buffers.ids[slots] = student_id
+            self._buffers.names[slots] = name
+            self._buffers.alive[slots] = True
+            self._buffers.group_start[slots] = start
+            self._buffers.group_size[slots] = count
+            if self.precision != "float32":
+                codes, scales = encode_compact(vectors, self.precision)
+                self._buffers.codes[slots] = codes
+                self._buffers.scales[slots] = scales
+            self._slots_by_id[student_id] = (start, count)
+            self._live_count += 1
+            self._live_templates += count
+            index = self._state.index
+            self._state = self._view(start + count, index)
+
+            # A reader still on the old view may get the new slots back
+            # from the index; _ann_search drops them
+            if index is not None:
+                grown = index.add(slots, vectors)
+            else:
+                grown = self._build_index(self._state)
+            if grown is not index:
+                self._state = self._state._replace(index=grown)
+
+            # Re-enrolment leaves the old slots dead, so adds need the same
+            # check as remove
+            self._maybe_compact()
+
+    def remove(self, student_id) -> bool:
+        """
+        Drop a student from matching
+
+        Returns:
+            True if the student was in the gallery
+        """
+        with self._write_lock:
+            if not self._discard(str(student_id)):
+                return False
+
+            self._maybe_compact()
+            return True
+
+    def _discard(self, student_id: str) -> bool:
+        """Mark a student's slots dead (lock held)"""
+        current = self._slots_by_id.pop(student_id, None)
+        if current is None:
+            return False
+
+        start, count = current
+        slots = np.arange(start, start + count)
+        self._buffers.alive[slots] = False
+        self._live_count -= 1
+        self._live_templates -= count
+        if self._state.index is not None:
+            self._state.index.remove(slots)
+        return True
+
+    def _grow(self, needed: int = 1):
+        """Copy the tail into buffers with room for needed more slots (lock held)"""
+        size = len(self._state.ids)
+        tail_rows = size - len(self._base)
+        new_tail_rows = max(
+            self.initial_capacity, 2 * tail_rows, tail_rows + needed, 16
+        )
+        buffers = self._allocate(len(self._base) + new_tail_rows, new_tail_rows)
+        buffers.tail[:tail_rows] = self._buffers.tail[:tail_rows]
+        for new, old in zip(buffers[2:-1], self._buffers[2:-1]):
+            new[:size] = old[:size]
+        self._buffers = buffers
+        self._state = self._view(size, self._state.index)
+
+    def _maybe_compact(self):
+        """Compact once dead slots exceed compact_ratio (lock held)"""
+        dead = len(self._state.ids) - self._live_templates
+        if dead > self.compact_ratio * len(self._state.ids):
+            self._compact()
+
+    def _compact(self):
+        """Rebuild the base without dead slots, then swap (lock held)"""
+        state = self._state
+        live = np.flatnonzero(state.alive)
+        ids, names = state.ids[live], state.names[live]
+        base = self.vectors(state, live)
+        if self.compact_store is not None:
+            # Persist and map the compacted rows so workers keep sharing
+            # them instead of each holding a private copy
+            try:
+                base = self.compact_store(ids, names, base, self.high_water_mark)
+            except Exception as e:
+                print(f"⚠️ Compacted gallery kept in memory: {e}")
+        self._replace_contents(base, ids, names)
+
+    @staticmethod
+    def vectors(state: GalleryState, slots: np.ndarray) -> np.ndarray:
+        """Gather the embeddings of the given slots from base and tail"""
+        base_rows = len(state.base)
+        out = np.empty((len(slots), state.base.shape[1]), dtype=np.float32)
+        in_base = slots < base_rows
+        out[in_base] = state.base[slots[in_base]]
+        out[~in_base] = state.tail[slots[~in_base] - base_rows]
+        return out
+
+    def subset(self, student_ids) -> "FaceGallery":
+        """
+        Copy the given students into a small exact-search gallery
+
+        Unknown ids are ignored.
+        """
+        state = self._state
+        wanted = np.array([str(sid) for sid in student_ids], dtype=object)
+        rows = np.flatnonzero(np.isin(state.ids, wanted) & state.alive)
+
+        sub = FaceGallery(
+            self.dim, initial_capacity=16, aggregation=self.aggregation
+        )
+        sub.load_arrays(
+            state.ids[rows],
+            state.names[rows],
+            self.vectors(state, rows),
+            normalized=True,
+        )
+        return sub
+
+    def _build_index(self, state: GalleryState):
+        """Build the ANN index over live slots, or None to use exact search"""
+        if not self.ann_backend or self._live_count < self.ann_min_size:
+            return None
+
+        slots = np.flatnonzero(state.alive)
+        index = create_ann_index(
+            self.ann_backend, self.dim, len(state.ids), **self.ann_params
+        )
+        return index.add(slots, self.vectors(state, slots))
+
+    def match(
+        self, embeddings, k: int = 1, threshold: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find the top-k enrolled students for each query embedding
+
+        Args:
+            embeddings: One embedding or a (q, dim) batch
+            k: Number of candidates per query
+            threshold: Candidates scoring below this get id/name None
+
+        Returns:
+            (ids, names, scores), each shaped (q, k) and ordered best first,
+            scores aggregated over each student's templates
+        """
+        state = self._state
+        index = state.index
+        queries = normalize_embeddings(embeddings)
+        heads = np.flatnonzero(state.group_start == np.arange(len(state.ids)))
+        k = min(k, int(np.count_nonzero(state.alive[heads])))
+
+        if k == 0:
+            empty = np.empty((queries.shape[0], 0), dtype=object)
+            return empty, empty.copy(), np.empty(empty.shape, dtype=np.float32)
+
+        if index is not None and self._live_count >= self.ann_min_size:
+            top, top_scores = self._ann_search(state, index, queries, k, heads)
+        else:
+            top, top_scores = self._exact_search(state, queries, k, heads)
+
+        top_ids = state.ids[top]
+        top_names = state.names[top]
+        if threshold is not None:
+            rejected = top_scores < threshold
+            top_ids[rejected] = None
+            top_names[rejected] = None
+
+        return top_ids, top_names, top_scores
+
+    def _exact_search(
+        self, state: GalleryState, queries: np.ndarray, k: int, heads: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Brute-force cosine top-k over live students
+
+        Returns:
+            (slots, scores) with the first slot of each matched student
+        """
+        if len(state.codes):
+            return self._compact_search(state, queries, k, heads)
+
+        scores = np.empty((len(queries), len(state.ids)), dtype=np.float32)
+        base_rows = len(state.base)
+        np.matmul(queries, state.base.T, out=scores[:, :base_rows])
+        np.matmul(queries, state.tail.T, out=scores[:, base_rows:])
+        student_scores = aggregate_scores(scores, heads, self.aggregation)
+        student_scores[:, ~state.alive[heads]] = -np.inf
+        top, top_scores = _top_k(student_scores, k)
+        return heads[top], top_scores
+
+    def _compact_search(
+        self, state: GalleryState, queries: np.ndarray, k: int, heads: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Score compact codes, then re-rank candidate students in float32"""
+        size = len(state.ids)
+        approx = np.empty((len(queries), size), dtype=np.float32)
+        for start in range(0, size, COMPACT_SCORE_CHUNK):
+            stop = min(start + COMPACT_SCORE_CHUNK, size)
+            block = state.codes[start:stop].astype(np.float32)
+            np.matmul(queries, block.T, out=approx[:, start:stop])
+        approx *= state.scales
+        student_scores = aggregate_scores(approx, heads, self.aggregation)
+        alive = state.alive[heads]
+        student_scores[:, ~alive] = -np.inf
+
+        num_candidates = min(max(k, self.rerank_candidates), int(alive.sum()))
+        candidates, _ = _top_k(student_scores, num_candidates)
+
+        top = np.empty((len(queries), k), dtype=np.int64)
+        top_scores = np.empty((len(queries), k), dtype=np.float32)
+        for i, rows in enumerate(candidates):
+            top[i], top_scores[i] = self._rescore(state, queries[i], heads[rows], k)
+        return top, top_scores
+
+    def _ann_search(
+        self,
+        state: GalleryState,
+        index,
+        queries: np.ndarray,
+        k: int,
+        heads: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        ANN search over templates, then exact aggregated scoring of the
+        students they belong to
+
+        The index is updated in place while readers may hold an older or
+        newer state, so it can return slots this state does not have yet
+        or has already removed; those are dropped before re-scoring.
+        """
+        try:
+            candidates, _ = index.search(
+                queries, max(k, self.rerank_candidates)
+            )
+        except RuntimeError:
+            return self._exact_search(state, queries, k, heads)
+
+        top = np.empty((len(queries), k), dtype=np.int64)
+        top_scores = np.empty((len(queries), k), dtype=np.float32)
+        for i, slots in enumerate(candidates):
+            slots = slots[slots < len(state.ids)]
+            slots = slots[state.alive[slots]]
+            students = np.unique(state.group_start[slots])
+            if len(students) < k:
+                # Too few distinct students among the nearest templates
+                exact_top, exact_scores = self._exact_search(
+                    state, queries[i : i + 1], k, heads
+                )
+                top[i], top_scores[i] = exact_top[0], exact_scores[0]
+            else:
+                top[i], top_scores[i] = self._rescore(
+                    state, queries[i], students, k
+                )
+        return top, top_scores
+
+    def _rescore(
+        self, state: GalleryState, query: np.ndarray, students: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact aggregated scores of candidate students for one query
+
+        Args:
+            students: First slots of at least k candidate students
+
+        Returns:
+            (slots, scores) of the best k, best first
+        """
+        sizes = state.group_size[students]
+        local_starts = np.cumsum(sizes) - sizes
+        slots = np.repeat(students - local_starts, sizes) + np.arange(sizes.sum())
+        scores = aggregate_scores(
+            (self.vectors(state, slots) @ query)[None, :],
+            local_starts,
+            self.aggregation,
+        )
+        scores[:, ~state.alive[students]] = -np.inf
+        top, top_scores = _top_k(scores, k)
+        return students[top[0]], top_scores[0]
+
+
+def _group_starts(ids: np.ndarray) -> np.ndarray:
+    """Indices where a new run of equal ids begins"""
+    if len(ids) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.append(True, ids[1:] != ids[:-1]))
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Column indices and values of the k largest scores per row, best first"""
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), (len(scores), k))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return (
+        np.take_along_axis(top, order, axis=1),
+        np.take_along_axis(top_scores, order, axis=1),
+    )
+
+
+def to_vector_literal(embedding: np.ndarray) -> str:
+    """Format one embedding as a pgvector text literal"""
+    return "[" + ",".join(map(repr, embedding.tolist())) + "]"
+
+
+class DatabaseGallery:
+    """
+    Gallery that matches inside Postgres using the pgvector HNSW index
+
+    Holds no embeddings in RAM, so several stateless API replicas can share
+    the student_templates table as one gallery. Exposes the same interface
+    as FaceGallery; load/add/remove are no-ops because the table is the
+    source of truth. A subset (course roster) is searched exactly, without
+    the index.
+
+    Each query takes the nearest max_templates * k templates from the
+    index and aggregates them per student, so top2_mean only sees a
+    student's second template if it is among those candidates.
+    """
+
+    def __init__(
+        self,
+        connection_factory,
+        ef_search: int = 40,
+        student_ids: List = None,
+        aggregation: str = "max",
+        max_templates: int = 5,
+    ):
+        if aggregation not in TEMPLATE_AGGREGATIONS:
+            raise ValueError(f"Unknown template aggregation '{aggregation}'")
+
+        self.connection_factory = connection_factory
+        self.ef_search = ef_search
+        self.aggregation = aggregation
+        self.max_templates = max_templates
+        self.student_ids = (
+            None if student_ids is None else [str(sid) for sid in student_ids]
+        )
+
+    def __len__(self) -> int:
+        conn = self.connection_factory()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT COUNT(DISTINCT student_id) FROM student_templates
+                WHERE %s::uuid[] IS NULL OR student_id = ANY(%s::uuid[])
+            """,
+                (self.student_ids, self.student_ids),
+            )
+            count = cur.fetchone()[0]
+            cur.close()
+            return count
+        finally:
+            conn.close()
+
+    def load(self, students: List[Dict]):
+        pass
+
+    def add(self, student_id, name: str, embedding):
+        pass
+
+    def __contains__(self, student_id) -> bool:
+        return self.student_ids is None or str(student_id) in self.student_ids
+
+    def remove(self, student_id) -> bool:
+        if self.student_ids is not None and str(student_id) in self.student_ids:
+            self.student_ids.remove(str(student_id))
+        return True
+
+    def subset(self, student_ids) -> "DatabaseGallery":
+        """Restrict matching to the given students"""
+        return DatabaseGallery(
+            self.connection_factory,
+            self.ef_search,
+            student_ids=student_ids,
+            aggregation=self.aggregation,
+            max_templates=self.max_templates,
+        )
+
+    def match(
+        self, embeddings, k: int = 1, threshold: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Top-k search for every query in one round-trip
+
+        Returns:
+            (ids, names, scores), each shaped (q, k) and ordered best first;
+            k shrinks to the number of enrolled students
+        """
+        queries = normalize_embeddings(embeddings)
+        conn = self.connection_factory()
+        try:
+            cur = conn.cursor()
+            num_templates = k * self.max_templates
+            cur.execute(
+                "SET LOCAL hnsw.ef_search = %s", (max(self.ef_search, num_templates),)
+            )
+            if self.student_ids is not None:
+                # The HNSW scan yields only ef_search candidates and the roster
+                # filter runs after it, so a small roster in a large table
+                # would match nobody. Score the roster's templates exactly
+                # instead; they are still found through the student_id index
+                # (bitmap scan).
+                cur.execute("SET LOCAL enable_indexscan = off")
+            cur.execute(
+                """
+                SELECT q.ord, m.id, m.name, m.similarity
+                FROM unnest(%s::vector[]) WITH ORDINALITY AS q(vec, ord)
+                CROSS JOIN LATERAL (
+                    SELECT s.id, s.name,
+                           CASE WHEN %s = 'max' THEN MAX(t.similarity)
+                                ELSE AVG(t.similarity) FILTER (WHERE t.rank <= 2)
+                           END AS similarity
+                    FROM (
+                        SELECT student_id, similarity,
+                               row_number() OVER (
+                                   PARTITION BY student_id ORDER BY similarity DESC
+                               ) AS rank
+                        FROM (
+                            SELECT student_id,
+                                   1 - (embedding <=> q.vec) AS similarity
+                            FROM student_templates
+                            WHERE %s::uuid[] IS NULL OR student_id = ANY(%s::uuid[])
+                            ORDER BY embedding <=> q.vec
+                            LIMIT %s
+                        ) nearest
+                    ) t
+                    JOIN students s ON s.id = t.student_id
+                    GROUP BY s.id, s.name
+                    ORDER BY similarity DESC
+                    LIMIT %s
+                ) m
+                ORDER BY q.ord, m.similarity DESC
+            """,
+                (
+                    [to_vector_literal(q) for q in queries],
+                    self.aggregation,
+                    self.student_ids,
+                    self.student_ids,
+                    num_templates,
+                    k,
+                ),
+            )
+            rows = cur.fetchall()
+            cur.close()
+        finally:
+            conn.close()
+
+        # Pad queries that got fewer rows back (e.g. a tiny table)
+        width = max(Counter(row[0] for row in rows).values(), default=0)
+        top_ids = np.full((len(queries), width), None, dtype=object)
+        top_names = np.full((len(queries), width), None, dtype=object)
+        top_scores = np.full((len(queries), width), -np.inf, dtype=np.float32)
+
+        filled = [0] * len(queries)
+        for ord_, student_id, name, similarity in rows:
+            row, col = ord_ - 1, filled[ord_ - 1]
+            filled[row] += 1
+            top_scores[row, col] = similarity
+            if threshold is None or similarity >= threshold:
+                top_ids[row, col] = str(student_id)
+                top_names[row, col] = name
+
+        return top_ids, top_names, top_scores
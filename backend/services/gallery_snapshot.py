@@ -0,0 +1,123 @@
+"""
+Versioned on-disk gallery snapshots
+A snapshot is a normalized float32 embedding matrix (.npy) plus a JSON
+index of student ids and names, tagged with the gallery_changes
+high-water mark it reflects. Workers np.load it with mmap_mode="r", so
+every process on the host shares one page-cache copy of the matrix.
+"""
+
+import fcntl
+import glob
+import json
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import List, Optional
+
+import numpy as np
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOTS_TO_KEEP = 2
+
+Snapshot = namedtuple("Snapshot", ["ids", "names", "matrix", "high_water_mark"])
+
+
+def _snapshot_paths(directory: str, high_water_mark: int):
+    stem = os.path.join(directory, f"gallery-{high_water_mark:012d}")
+    return f"{stem}.npy", f"{stem}.json"
+
+
+@contextmanager
+def snapshot_lock(directory: str):
+    """Exclusive lock so only one worker rebuilds a snapshot at a time"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_snapshot(
+    directory: str,
+    ids: List[str],
+    names: List[str],
+    matrix: np.ndarray,
+    high_water_mark: int,
+):
+    """
+    Write a snapshot atomically and prune older ones
+
+    Args:
+        matrix: Normalized float32 templates, one row per id (a student
+            with several templates repeats its id on adjacent rows)
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix_path, index_path = _snapshot_paths(directory, high_water_mark)
+
+    tmp_matrix = f"{matrix_path}.tmp"
+    with open(tmp_matrix, "wb") as f:
+        np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+    os.replace(tmp_matrix, matrix_path)
+
+    # The index is written last; a snapshot only counts once it exists
+    tmp_index = f"{index_path}.tmp"
+    with open(tmp_index, "w") as f:
+        json.dump(
+            {
+                "format": SNAPSHOT_FORMAT,
+                "high_water_mark": high_water_mark,
+                "ids": [str(student_id) for student_id in ids],
+                "names": list(names),
+            },
+            f,
+        )
+    os.replace(tmp_index, index_path)
+
+    # Mapped files stay readable after unlink, so pruning is safe
+    for old_index in sorted(glob.glob(os.path.join(directory, "gallery-*.json")))[
+        :-SNAPSHOTS_TO_KEEP
+    ]:
+        for path in (old_index, old_index[: -len(".json")] + ".npy"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def map_snapshot(
+    directory: str,
+    ids: List[str],
+    names: List[str],
+    matrix: np.ndarray,
+    high_water_mark: int,
+) -> np.ndarray:
+    """Write a snapshot and return its matrix memory-mapped read-only"""
+    with snapshot_lock(directory):
+        write_snapshot(directory, ids, names, matrix, high_water_mark)
+        matrix_path, _ = _snapshot_paths(directory, high_water_mark)
+        return np.load(matrix_path, mmap_mode="r")
+
+
+def read_latest_snapshot(directory: str) -> Optional[Snapshot]:
+    """Memory-map the newest complete snapshot, or None if there is none"""
+    for index_path in sorted(
+        glob.glob(os.path.join(directory, "gallery-*.json")), reverse=True
+    ):
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+            if index.get("format") != SNAPSHOT_FORMAT:
+                continue
+            matrix = np.load(index_path[: -len(".json")] + ".npy", mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Skipping unreadable snapshot {index_path}: {e}")
+            continue
+
+        if matrix.shape[0] != len(index["ids"]):
+            continue
+        return Snapshot(
+            index["ids"], index["names"], matrix, index["high_water_mark"]
+        )
+    return None
@@ -0,0 +1,122 @@
+"""
+Cross-worker gallery synchronisation
+Workers start from the shared on-disk snapshot and catch up through the
+gallery_changes log; afterwards enrol/delete publish a delta on the gallery
+channel in the same transaction as the write, and every other worker
+applies it to its own in-memory gallery
+"""
+
+from functools import partial
+
+from config import settings
+from dependencies import face_gallery, session_galleries
+from services.gallery_service import normalize_embeddings
+from services.gallery_snapshot import (
+    map_snapshot,
+    read_latest_snapshot,
+    snapshot_lock,
+    write_snapshot,
+)
+from utils.database import (
+    fetch_high_water_mark,
+    load_gallery_arrays,
+    load_gallery_changes,
+    load_student,
+)
+from utils.notifications import notify
+
+GALLERY_CHANNEL = "gallery_updates"
+
+# Sequence values can commit out of order, so catch-up re-reads a window
+# below the high-water mark; replaying a change is idempotent
+CHANGE_REPLAY_OVERLAP = 100
+
+
+def publish_gallery_change(cur, op: str, student_id):
+    """
+    Queue a gallery delta on the cursor's transaction
+
+    Args:
+        op: 'add' or 'remove'
+    """
+    notify(cur, GALLERY_CHANNEL, {"op": op, "student_id": str(student_id)})
+
+
+def apply_gallery_change(payload: dict):
+    """Apply a delta published by another worker"""
+    student_id = payload["student_id"]
+
+    if payload["op"] == "add":
+        student = load_student(student_id)
+        if student:
+            face_gallery.add(student["id"], student["name"], student["embedding"])
+            session_galleries.update_student(
+                student["id"], student["name"], student["embedding"]
+            )
+    elif payload["op"] == "remove":
+        face_gallery.remove(student_id)
+        session_galleries.remove_student(student_id)
+
+
+def bootstrap_gallery():
+    """
+    Load the gallery at startup
+
+    Maps the newest snapshot if it is recent enough, otherwise one worker
+    (under a file lock) reloads the table and writes a fresh snapshot.
+    Either way the gallery then catches up on changes past the snapshot.
+    Later compactions write a new snapshot and map it too.
+    """
+    directory = settings.GALLERY_SNAPSHOT_DIR
+    if not directory:
+        ids, names, matrix, high_water_mark = load_gallery_arrays()
+        face_gallery.load_arrays(ids, names, matrix)
+        face_gallery.high_water_mark = high_water_mark
+        return
+
+    with snapshot_lock(directory):
+        snapshot = read_latest_snapshot(directory)
+        if (
+            snapshot is None
+            or fetch_high_water_mark() - snapshot.high_water_mark
+            > settings.GALLERY_SNAPSHOT_MAX_LAG
+        ):
+            print("Writing new gallery snapshot...")
+            ids, names, matrix, high_water_mark = load_gallery_arrays()
+            write_snapshot(
+                directory, ids, names, normalize_embeddings(matrix), high_water_mark
+            )
+            snapshot = read_latest_snapshot(directory)
+
+    face_gallery.load_arrays(
+        snapshot.ids, snapshot.names, snapshot.matrix, normalized=True
+    )
+    face_gallery.high_water_mark = snapshot.high_water_mark
+    face_gallery.compact_store = partial(map_snapshot, directory)
+    print(f"Mapped gallery snapshot at change #{snapshot.high_water_mark}")
+    catch_up_gallery()
+
+
+def catch_up_gallery():
+    """Apply every change logged after the gallery's high-water mark"""
+    added, removed_ids, high_water_mark = load_gallery_changes(
+        max(0, face_gallery.high_water_mark - CHANGE_REPLAY_OVERLAP)
+    )
+    for student in added:
+        face_gallery.add(student["id"], student["name"], student["embedding"])
+        session_galleries.update_student(
+            student["id"], student["name"], student["embedding"]
+        )
+    for student_id in removed_ids:
+        face_gallery.remove(student_id)
+        session_galleries.remove_student(student_id)
+    face_gallery.high_water_mark = high_water_mark
+
+    if added or removed_ids:
+        print(f"Caught up {len(added)} added / {len(removed_ids)} removed students")
+
+
+def resync_gallery():
+    """Catch up after the listener missed notifications"""
+    print("Resyncing face gallery after listener reconnect...")
+    catch_up_gallery()
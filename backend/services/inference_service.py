@@ -0,0 +1,217 @@
+"""
+Face inference off the event loop
+A pool of worker processes, each holding its own FaceAnalysis model, runs
+detection and recognition for the API. Endpoints await results, and a
+bounded number of pending jobs keeps a burst from queueing without limit.
+Concurrent requests are micro-batched so a rush of selfies shares one
+recognition call per batch.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+from services.face_engine import create_face_app, extract_embeddings
+
+# Model owned by this worker process (set by _init_worker)
+_worker_app = None
+
+
+class InferenceBusyError(Exception):
+    """Raised when the inference queue is full; callers should retry later"""
+
+
+def _init_worker(model_kwargs: Dict):
+    global _worker_app
+    _worker_app = create_face_app(**model_kwargs)
+    print(f"✅ Inference worker {os.getpid()} ready")
+
+
+def _warmup() -> int:
+    return os.getpid()
+
+
+def _detect_faces(images: List[str], decode_min_side: int):
+    return extract_embeddings(_worker_app, images, decode_min_side)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent detect requests into one pool job
+
+    A batch is sent when it reaches max_batch images or max_wait_ms after
+    its first image arrived, whichever comes first. Runs on the event loop,
+    so no locking is needed.
+    """
+
+    def __init__(
+        self, executor: "InferenceExecutor", max_batch: int, max_wait_ms: float
+    ):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []  # (image_data, future)
+        self._timer = None
+
+    async def detect_face(self, image_data: str):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((image_data, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        try:
+            results = await self.executor.submit(
+                _detect_faces,
+                [image_data for image_data, _ in batch],
+                self.executor.decode_min_side,
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class InferenceExecutor:
+    """
+    Runs face inference in worker processes
+
+    Workers detect at det_size on images decoded down to decode_min_side,
+    a profile meant for single-face phone selfies.
+
+    With workers=0 the model is loaded once in this process and jobs run on
+    a single background thread instead (development / tiny deployments).
+    At most max_pending jobs may be queued or running; beyond that submit
+    raises InferenceBusyError instead of waiting. With max_batch > 1,
+    detect_face requests are grouped by a MicroBatcher and each batch
+    counts as one job.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        det_size: Tuple[int, int],
+        providers: Sequence[str],
+        ctx_id: int = 0,
+        workers: int = 2,
+        intra_op_threads: int = 0,
+        max_pending: int = 32,
+        max_batch: int = 1,
+        max_wait_ms: float = 5.0,
+        modules: Sequence[str] = ("detection", "recognition"),
+        decode_min_side: int = 0,
+        inter_op_threads: int = 0,
+        optimized_model_dir: str = "",
+    ):
+        self.workers = workers
+        self.decode_min_side = decode_min_side
+        # Split the cores between workers unless set explicitly
+        if workers and not intra_op_threads:
+            intra_op_threads = max(1, (os.cpu_count() or 1) // workers)
+        self.initargs = (
+            {
+                "model_name": model_name,
+                "det_size": det_size,
+                "providers": tuple(providers),
+                "ctx_id": ctx_id,
+                "intra_op_threads": intra_op_threads,
+                "modules": tuple(modules),
+                "inter_op_threads": inter_op_threads,
+                "optimized_model_dir": optimized_model_dir,
+            },
+        )
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._batcher = (
+            MicroBatcher(self, max_batch, max_wait_ms) if max_batch > 1 else None
+        )
+
+    def start(self):
+        """Create the pool and load the model in every worker"""
+        if self._pool is not None:
+            return
+
+        if self.workers:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # fork would copy the API's threads and DB sockets. spawn
+                # re-imports the launching script, so importing main must
+                # stay cheap (dependencies loads face_app lazily)
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=self.initargs,
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="inference",
+                initializer=_init_worker,
+                initargs=self.initargs,
+            )
+
+        # Workers start lazily; load every model now rather than on the
+        # first requests
+        for future in [
+            self._pool.submit(_warmup) for _ in range(max(self.workers, 1))
+        ]:
+            future.result()
+        print(f"✅ Inference pool started ({max(self.workers, 1)} workers)")
+
+    def shutdown(self):
+        """Stop the workers, cancelling queued jobs"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def submit(self, fn, *args):
+        """
+        Run fn(*args) in the pool and await its result
+
+        Raises:
+            InferenceBusyError: max_pending jobs are already in flight
+        """
+        if self._pool is None:
+            self.start()
+        if not self._slots.acquire(blocking=False):
+            raise InferenceBusyError(
+                f"Face inference queue is full ({self.max_pending} pending)"
+            )
+        try:
+            return await asyncio.wrap_future(self._pool.submit(fn, *args))
+        finally:
+            self._slots.release()
+
+    async def detect_face(self, image_data: str):
+        """
+        Detect and embed the first face in a base64 image
+
+        Returns: (success, embedding, error_message)
+        """
+        if self._batcher is not None:
+            return await self._batcher.detect_face(image_data)
+        results = await self.submit(
+            _detect_faces, [image_data], self.decode_min_side
+        )
+        return results[0]
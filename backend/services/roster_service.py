@@ -0,0 +1,118 @@
+"""
+Course rosters and session-scoped candidate galleries
+A session only needs to match against the students on its course roster,
+so each session gets a small sub-gallery cached until it closes or expires
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def fetch_roster_student_ids(conn, course_name: str) -> List[str]:
+    """Student UUIDs on a course roster"""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT student_id FROM course_rosters WHERE course_name = %s",
+        (course_name,),
+    )
+    student_ids = [str(row[0]) for row in cur.fetchall()]
+    cur.close()
+    return student_ids
+
+
+class SessionGalleryCache:
+    """
+    Per-session candidate galleries keyed by session id
+
+    Sessions whose course has no roster fall back to the full gallery.
+    Entries are built at session creation, rebuilt lazily on a cache miss
+    (e.g. on another worker) and dropped on close, expiry or roster change.
+    """
+
+    def __init__(self, gallery, connection_factory):
+        self.gallery = gallery
+        self.connection_factory = connection_factory
+        self._lock = threading.Lock()
+        # session_id -> {"course_name", "expires_at", "gallery"}
+        self._entries: Dict[str, Dict] = {}
+
+    def build(self, session_id, course_name: str, expires_at: datetime):
+        """Build and cache the candidate gallery for a session"""
+        conn = self.connection_factory()
+        try:
+            student_ids = fetch_roster_student_ids(conn, course_name)
+        finally:
+            conn.close()
+
+        sub_gallery = self.gallery.subset(student_ids) if student_ids else None
+        with self._lock:
+            self._entries[str(session_id)] = {
+                "course_name": course_name,
+                "expires_at": expires_at,
+                "gallery": sub_gallery,
+            }
+        return sub_gallery or self.gallery
+
+    def get(self, session: Dict):
+        """
+        Candidate gallery for a validated attendance_sessions row
+
+        Args:
+            session: Row with 'id', 'course_name' and 'expires_at'
+        """
+        self.purge_expired()
+        with self._lock:
+            entry = self._entries.get(str(session["id"]))
+        if entry is None:
+            return self.build(
+                session["id"], session["course_name"], session["expires_at"]
+            )
+        return entry["gallery"] or self.gallery
+
+    def evict(self, session_id):
+        """Drop a session's gallery (session closed)"""
+        with self._lock:
+            self._entries.pop(str(session_id), None)
+
+    def clear(self):
+        """Drop every gallery; each is rebuilt on its next lookup"""
+        with self._lock:
+            self._entries.clear()
+
+    def evict_course(self, course_name: str):
+        """Drop galleries of every session of a course (roster changed)"""
+        with self._lock:
+            for session_id in [
+                sid
+                for sid, entry in self._entries.items()
+                if entry["course_name"] == course_name
+            ]:
+                del self._entries[session_id]
+
+    def update_student(self, student_id, name: str, embedding):
+        """Refresh a student's templates in every sub-gallery holding them"""
+        with self._lock:
+            galleries = [e["gallery"] for e in self._entries.values() if e["gallery"]]
+        for gallery in galleries:
+            if student_id in gallery:
+                gallery.add(student_id, name, embedding)
+
+    def remove_student(self, student_id):
+        """Remove a deleted student from every cached sub-gallery"""
+        with self._lock:
+            galleries = [e["gallery"] for e in self._entries.values() if e["gallery"]]
+        for gallery in galleries:
+            gallery.remove(student_id)
+
+    def purge_expired(self, now: Optional[datetime] = None):
+        """Drop galleries of sessions past their expiry"""
+        now = now or datetime.now()
+        with self._lock:
+            for session_id in [
+                sid for sid, entry in self._entries.items() if entry["expires_at"] <= now
+            ]:
+                del self._entries[session_id]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,132 @@
+"""
+Active attendance sessions cached for the check-in path
+verify-location looks a session up by OTP and mark-secure by id + OTP;
+both read the same attendance_sessions row for every student, so one
+query per session per TTL serves the whole class.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from psycopg2.extras import RealDictCursor
+
+# Columns the check-in path needs: geofence, SSID, expiry
+SESSION_COLUMNS = """
+    id, otp, course_name, classroom_lat, classroom_lon,
+    geofence_radius, allowed_wifi_ssid, expires_at, is_active
+"""
+
+
+class SessionCache:
+    """
+    TTL cache of active sessions keyed by id and by OTP
+
+    Only active, unexpired sessions are cached. An entry lives for
+    ttl_seconds or until the session expires, whichever is first, and
+    is dropped on close (locally and, through NOTIFY, on other workers).
+    The write in mark-secure re-checks the session in SQL, so a stale
+    entry can never mark attendance on a closed session.
+
+    Args:
+        connection_factory: Returns a DB connection
+        ttl_seconds: Longest an entry is served without re-reading it
+    """
+
+    def __init__(self, connection_factory, ttl_seconds: float = 30.0):
+        self.connection_factory = connection_factory
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # session_id -> (row, monotonic deadline)
+        self._by_id: Dict[str, tuple] = {}
+        # otp -> session_id
+        self._by_otp: Dict[str, str] = {}
+        # Bumped on evict/clear so a load racing a close is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def by_otp(self, otp: str) -> Optional[Dict]:
+        """Active session with this OTP, or None"""
+        with self._lock:
+            row = self._lookup(self._by_otp.get(otp))
+        if row is not None:
+            return row
+        return self._load("otp = %s", (otp,))
+
+    def by_id(self, session_id: str, otp: str) -> Optional[Dict]:
+        """Active session with this id if the OTP matches, or None"""
+        with self._lock:
+            row = self._lookup(str(session_id))
+        if row is not None:
+            return row if row["otp"] == otp else None
+        return self._load("id = %s AND otp = %s", (session_id, otp))
+
+    def evict(self, session_id):
+        """Drop a session (closed here or on another worker)"""
+        session_id = str(session_id)
+        with self._lock:
+            self._generation += 1
+            entry = self._by_id.pop(session_id, None)
+            if entry is not None and self._by_otp.get(entry[0]["otp"]) == session_id:
+                del self._by_otp[entry[0]["otp"]]
+
+    def clear(self):
+        """Drop every entry, e.g. after missed notifications"""
+        with self._lock:
+            self._generation += 1
+            self._by_id.clear()
+            self._by_otp.clear()
+
+    def _lookup(self, session_id: Optional[str]) -> Optional[Dict]:
+        """Cached row if still fresh; counts the hit or miss (lock held)"""
+        entry = self._by_id.get(session_id) if session_id else None
+        if entry is not None:
+            row, deadline = entry
+            if time.monotonic() < deadline and row["expires_at"] > datetime.now():
+                self.hits += 1
+                return row
+            del self._by_id[session_id]
+            if self._by_otp.get(row["otp"]) == session_id:
+                del self._by_otp[row["otp"]]
+        self.misses += 1
+        return None
+
+    def _load(self, where: str, params: tuple) -> Optional[Dict]:
+        generation = self._generation
+        conn = self.connection_factory()
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                f"SELECT {SESSION_COLUMNS} FROM attendance_sessions"
+                f" WHERE {where} AND is_active = TRUE AND expires_at > NOW()",
+                params,
+            )
+            row = cur.fetchone()
+            cur.close()
+        finally:
+            conn.close()
+
+        if row is not None:
+            session_id = str(row["id"])
+            with self._lock:
+                if generation != self._generation:
+                    return row
+                self._by_id[session_id] = (row, time.monotonic() + self.ttl_seconds)
+                self._by_otp[row["otp"]] = session_id
+        return row
+
+    def status(self) -> Dict:
+        with self._lock:
+            size = len(self._by_id)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._by_id)
@@ -0,0 +1,41 @@
+"""
+Cross-worker session invalidation
+Closing a session or changing a course roster publishes it on the session
+channel in the same transaction as the write; every other worker drops
+its cached session and the affected roster galleries
+"""
+
+from dependencies import session_cache, session_galleries
+from utils.notifications import notify
+
+SESSION_CHANNEL = "session_updates"
+
+
+def publish_session_change(cur, op: str, session_id):
+    """
+    Queue a session change on the cursor's transaction
+
+    Args:
+        op: 'close'
+    """
+    notify(cur, SESSION_CHANNEL, {"op": op, "session_id": str(session_id)})
+
+
+def publish_roster_change(cur, course_name: str):
+    """Queue a roster change of a course on the cursor's transaction"""
+    notify(cur, SESSION_CHANNEL, {"op": "roster", "course_name": course_name})
+
+
+def apply_session_change(payload: dict):
+    """Apply a change published by another worker"""
+    if payload["op"] == "close":
+        session_cache.evict(payload["session_id"])
+        session_galleries.evict(payload["session_id"])
+    elif payload["op"] == "roster":
+        session_galleries.evict_course(payload["course_name"])
+
+
+def resync_sessions():
+    """Notifications may have been missed; re-read sessions on next use"""
+    session_cache.clear()
+    session_galleries.clear()
@@ -0,0 +1,243 @@
+"""
+Attendance from recorded lecture video
+Frames are sampled at a fixed rate and decoded by several threads, each
+over its own segment of the file, with detection and alignment on the
+decoding thread. Faces from many frames are then embedded and matched in
+large batches, and matches are aggregated into per-student sightings.
+"""
+
+import json
+import math
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import cv2
+import numpy as np
+from insightface.utils import face_align
+
+# Marks a decoder thread as finished on the face queue
+_SEGMENT_DONE = object()
+
+# Seconds a decoder waits on a full face queue before rechecking stop
+_PUT_TIMEOUT = 0.5
+
+
+def _put(faces: queue.Queue, item, stop: threading.Event) -> bool:
+    """Queue item, giving up once stop is set; returns False if it gave up"""
+    while not stop.is_set():
+        try:
+            faces.put(item, timeout=_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _decode_segment(
+    path, start, end, step, face_app, faces: queue.Queue, errors, stop
+):
+    """Sample frames start..end on the global step grid; queue aligned faces"""
+    capture = cv2.VideoCapture(path)
+    recognizer = face_app.models["recognition"]
+    try:
+        first = math.ceil(start / step) * step
+        capture.set(cv2.CAP_PROP_POS_FRAMES, first)
+        for index in range(first, end):
+            if stop.is_set():
+                break
+            if (index - first) % step:
+                # grab() skips the colour conversion of unsampled frames
+                if not capture.grab():
+                    break
+                continue
+            success, frame = capture.read()
+            if not success:
+                break
+
+            _, kpss = face_app.det_model.detect(frame, max_num=0, metric="default")
+            crops = [
+                face_align.norm_crop(
+                    frame, landmark=kps, image_size=recognizer.input_size[0]
+                )
+                for kps in (kpss if kpss is not None else [])
+            ]
+            if not _put(faces, (index, crops), stop):
+                break
+    except Exception as e:
+        errors.append(e)
+    finally:
+        capture.release()
+        _put(faces, _SEGMENT_DONE, stop)
+
+
+def process_video(
+    path: str,
+    face_app,
+    gallery,
+    threshold: float,
+    sample_fps: float = 2.0,
+    workers: int = 4,
+    batch_size: int = 64,
+    min_sightings: int = 3,
+) -> Dict:
+    """
+    Recognize everyone seen in a video file
+
+    Args:
+        gallery: Candidate gallery (e.g. the session's roster gallery)
+        sample_fps: Frames analysed per second of video
+        workers: Decoder threads, each over an equal segment of the file
+        batch_size: Faces per recognition call
+        min_sightings: Matched faces needed to count a student present
+
+    Returns:
+        Report with 'students' (id, name, sightings, best score and first /
+        last seen second, most sighted first, present ones only) and the
+        frame counts, timings and throughput of the run
+
+    Raises:
+        ValueError: The file cannot be read as a video
+    """
+    capture = cv2.VideoCapture(path)
+    total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    capture.release()
+    if total_frames <= 0:
+        raise ValueError(f"Could not read video {path}")
+
+    step = max(1, round(video_fps / sample_fps))
+    workers = max(1, min(workers, math.ceil(total_frames / step)))
+    bounds = np.linspace(0, total_frames, workers + 1).astype(int)
+
+    started = time.perf_counter()
+    faces: queue.Queue = queue.Queue(maxsize=workers * 8)
+    errors: List[Exception] = []
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=_decode_segment,
+            args=(path, bounds[i], bounds[i + 1], step, face_app, faces, errors, stop),
+            name=f"video-decode-{i}",
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    recognizer = face_app.models["recognition"]
+    sightings: Dict[str, Dict] = {}
+    frames_sampled = faces_seen = 0
+    pending_crops, pending_frames = [], []
+
+    def flush():
+        embeddings = recognizer.get_feat(pending_crops)
+        ids, names, scores = gallery.match(list(embeddings), k=1, threshold=threshold)
+        for row, index in enumerate(pending_frames):
+            if not ids.shape[1] or ids[row, 0] is None:
+                continue
+            second = index / video_fps
+            entry = sightings.setdefault(
+                str(ids[row, 0]),
+                {
+                    "student_id": str(ids[row, 0]),
+                    "name": names[row, 0],
+                    "sightings": 0,
+                    "best_score": 0.0,
+                    "first_seen": second,
+                    "last_seen": second,
+                },
+            )
+            entry["sightings"] += 1
+            entry["best_score"] = max(entry["best_score"], float(scores[row, 0]))
+            entry["first_seen"] = min(entry["first_seen"], second)
+            entry["last_seen"] = max(entry["last_seen"], second)
+        pending_crops.clear()
+        pending_frames.clear()
+
+    try:
+        running = workers
+        while running:
+            item = faces.get()
+            if item is _SEGMENT_DONE:
+                running -= 1
+                continue
+            index, crops = item
+            frames_sampled += 1
+            faces_seen += len(crops)
+            pending_crops.extend(crops)
+            pending_frames.extend([index] * len(crops))
+            if len(pending_crops) >= batch_size:
+                flush()
+        if pending_crops:
+            flush()
+    finally:
+        # If matching failed, decoders may be blocked on the full queue:
+        # tell them to stop, empty the queue and wait for them to exit
+        stop.set()
+        while True:
+            try:
+                faces.get_nowait()
+            except queue.Empty:
+                break
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - started
+    video_seconds = total_frames / video_fps
+    present = sorted(
+        (s for s in sightings.values() if s["sightings"] >= min_sightings),
+        key=lambda s: -s["sightings"],
+    )
+    return {
+        "students": present,
+        "video_seconds": round(video_seconds, 1),
+        "frames_sampled": frames_sampled,
+        "faces_detected": faces_seen,
+        "processing_seconds": round(elapsed, 2),
+        "frames_per_second": round(frames_sampled / elapsed, 1) if elapsed else 0.0,
+        "realtime_factor": round(video_seconds / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def record_video_attendance(conn, session_id, students: List[Dict]) -> int:
+    """
+    Mark the report's students present in a session
+
+    Students already marked (e.g. by mark-secure) keep their record.
+
+    Returns: Number of newly marked students
+    """
+    cur = conn.cursor()
+    marked_at = datetime.now()
+    marked = 0
+    for student in students:
+        cur.execute(
+            """
+            INSERT INTO session_attendance
+            (session_id, student_id, marked_at, verification_scores,
+             verification_method)
+            VALUES (%s, %s, %s, %s, 'video')
+            ON CONFLICT (session_id, student_id) DO NOTHING
+        """,
+            (
+                session_id,
+                student["student_id"],
+                marked_at,
+                json.dumps(
+                    {
+                        "face_confidence": student["best_score"],
+                        "sightings": student["sightings"],
+                    }
+                ),
+            ),
+        )
+        marked += cur.rowcount
+    conn.commit()
+    cur.close()
+    return marked
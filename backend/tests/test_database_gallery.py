@@ -0,0 +1,112 @@
+"""
+DatabaseGallery against a scratch schema in the configured database
+Skipped when Postgres with pgvector is not reachable (DB_* settings)
+"""
+
+import uuid
+
+import numpy as np
+import psycopg2
+import pytest
+from psycopg2.extras import execute_values
+
+from config import settings
+from services.gallery_service import DatabaseGallery, to_vector_literal
+
+GALLERY_SIZE = 20000
+ROSTER_SIZE = 50
+
+
+def connect(schema: str = None):
+    options = f"-c search_path={schema},public" if schema else None
+    return psycopg2.connect(
+        host=settings.DB_HOST,
+        database=settings.DB_NAME,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        options=options,
+    )
+
+
+@pytest.fixture
+def gallery_schema():
+    """Schema holding students and their templates, dropped after"""
+    try:
+        conn = connect()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres not reachable: {e}")
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    except psycopg2.Error as e:
+        conn.close()
+        pytest.skip(f"pgvector not available: {e}")
+
+    schema = f"test_gallery_{uuid.uuid4().hex[:8]}"
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(
+        f"""
+        CREATE TABLE {schema}.students (
+            id UUID PRIMARY KEY,
+            name TEXT NOT NULL
+        )
+    """
+    )
+    cur.execute(
+        f"""
+        CREATE TABLE {schema}.student_templates (
+            id SERIAL PRIMARY KEY,
+            student_id UUID NOT NULL REFERENCES {schema}.students(id),
+            embedding vector(512) NOT NULL
+        )
+    """
+    )
+    cur.execute(f"CREATE INDEX ON {schema}.student_templates(student_id)")
+    try:
+        yield schema
+    finally:
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.close()
+
+
+def test_small_roster_in_large_gallery(gallery_schema):
+    rng = np.random.default_rng(0)
+    ids = [str(uuid.uuid4()) for _ in range(GALLERY_SIZE)]
+    embeddings = rng.standard_normal((GALLERY_SIZE, 512)).astype(np.float32)
+
+    conn = connect(gallery_schema)
+    cur = conn.cursor()
+    execute_values(
+        cur,
+        "INSERT INTO students (id, name) VALUES %s",
+        [(student_id, f"student {i}") for i, student_id in enumerate(ids)],
+    )
+    execute_values(
+        cur,
+        "INSERT INTO student_templates (student_id, embedding) VALUES %s",
+        [
+            (student_id, to_vector_literal(embedding))
+            for student_id, embedding in zip(ids, embeddings)
+        ],
+    )
+    cur.execute(
+        "CREATE INDEX ON student_templates USING hnsw (embedding vector_cosine_ops)"
+    )
+    conn.commit()
+    conn.close()
+
+    gallery = DatabaseGallery(lambda: connect(gallery_schema), ef_search=40)
+    roster = rng.choice(GALLERY_SIZE, ROSTER_SIZE, replace=False)
+    session_gallery = gallery.subset([ids[i] for i in roster])
+
+    # Queries that are closest to students outside the roster
+    outsiders = np.setdiff1d(np.arange(GALLERY_SIZE), roster)[:20]
+    match_ids, _, _ = session_gallery.match(embeddings[outsiders], k=1)
+    assert match_ids.shape == (len(outsiders), 1)
+    assert set(match_ids[:, 0]) <= {ids[i] for i in roster}
+
+    # A roster student is found among the whole table's near neighbours
+    query = embeddings[roster[0]] + 0.3 * rng.standard_normal(512)
+    match_ids, _, _ = session_gallery.match(query, k=1)
+    assert match_ids[0, 0] == ids[roster[0]]
@@ -0,0 +1,77 @@
+"""
+FaceGallery with an HNSW index under concurrent enrolment, deletion and
+matching
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from services.gallery_service import FaceGallery
+
+pytest.importorskip("hnswlib")
+
+INITIAL_STUDENTS = 200
+ADDS = 3000
+MATCHERS = 4
+
+
+def test_match_during_add_and_remove():
+    rng = np.random.default_rng(0)
+    # A small initial capacity makes the index grow several times
+    gallery = FaceGallery(ann_backend="hnsw", ann_min_size=10, initial_capacity=16)
+    embeddings = {
+        f"s{i}": rng.standard_normal(512) for i in range(INITIAL_STUDENTS)
+    }
+    gallery.load(
+        [
+            {"id": student_id, "name": student_id, "embedding": embedding}
+            for student_id, embedding in embeddings.items()
+        ]
+    )
+    known = {f"s{i}" for i in range(INITIAL_STUDENTS)}
+    known.update(f"a{i}" for i in range(ADDS))
+
+    stop = threading.Event()
+    errors = []
+    matches = [0] * MATCHERS
+
+    def matcher(n: int):
+        queries = np.random.default_rng(n + 1)
+        while not stop.is_set():
+            try:
+                ids, _, scores = gallery.match(queries.standard_normal((2, 512)), k=3)
+                assert ids.shape == (2, 3)
+                assert set(ids.ravel()) <= known
+                assert np.all(np.diff(scores, axis=1) <= 0)
+                matches[n] += 1
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=matcher, args=(n,)) for n in range(MATCHERS)]
+    for thread in threads:
+        thread.start()
+
+    enrolled = [f"s{i}" for i in range(INITIAL_STUDENTS)]
+    try:
+        for i in range(ADDS):
+            embeddings[f"a{i}"] = rng.standard_normal(512)
+            gallery.add(f"a{i}", f"a{i}", embeddings[f"a{i}"])
+            enrolled.append(f"a{i}")
+            if i % 3 == 0:
+                gallery.remove(enrolled.pop(rng.integers(len(enrolled))))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert not errors, errors[:3]
+    assert all(matches)
+    assert len(gallery) == len(enrolled)
+
+    # Every remaining student is still found by its own embedding
+    for student_id in enrolled[-20:]:
+        ids, _, _ = gallery.match(embeddings[student_id], k=1)
+        assert ids[0, 0] == student_id
@@ -1,34 +1,163 @@
-import json
 import numpy as np
-from psycopg2.extras import RealDictCursor
 from dependencies import get_db_connection
+from services.gallery_service import EMBEDDING_DIM
 
+# student_templates.embedding_f32 holds big-endian float32 (Postgres float4send)
+EMBEDDING_DTYPE = np.dtype(">f4")
 
-def load_all_students():
-    """Load all students with embeddings from database"""
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("SELECT name, embedding FROM students")
-        rows = cur.fetchall()
-
-        students = []
-        for row in rows:
-            emb_str = row["embedding"]
-            if isinstance(emb_str, str):
-                clean_str = emb_str.replace("np.str_('", "").replace("')", "")
-                emb_list = json.loads(clean_str)
-                embedding = np.array(emb_list).astype(np.float32)
-            else:
-                embedding = np.array(emb_str).astype(np.float32)
-            print(f"Student: {row['name']}, Embedding Shape: {embedding.shape}")
-
-            students.append({"name": row["name"], "embedding": embedding})
-
-        cur.close()
-        conn.close()
-        print(f"Loaded {len(students)} students from database")
-        return students
-    except Exception as e:
-        print(f"Database Error: {e}")
-        return []
+
+def load_gallery_arrays(batch_size: int = 10000):
+    """
+    Stream every face template straight into one preallocated matrix
+
+    Rows come through a server-side cursor in batches, ordered so each
+    student's templates are adjacent, and each batch of raw float32 bytes
+    is decoded with a single np.frombuffer call.
+
+    Returns:
+        (ids, names, matrix, high_water_mark) with one row per template,
+        matrix shaped (n, EMBEDDING_DIM) and the gallery_changes seq it
+        reflects
+    """
+    conn = get_db_connection()
+    # Count and rows must come from the same snapshot
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT COUNT(*) FROM student_templates WHERE embedding_f32 IS NOT NULL"
+    )
+    total = cur.fetchone()[0]
+    cur.execute("SELECT COALESCE(MAX(seq), 0) FROM gallery_changes")
+    high_water_mark = cur.fetchone()[0]
+    cur.close()
+
+    ids = []
+    names = []
+    matrix = np.empty((total, EMBEDDING_DIM), dtype=np.float32)
+
+    cur = conn.cursor(name="gallery_loader")
+    cur.itersize = batch_size
+    cur.execute(
+        """
+        SELECT s.id, s.name, t.embedding_f32
+        FROM student_templates t
+        JOIN students s ON s.id = t.student_id
+        WHERE t.embedding_f32 IS NOT NULL
+        ORDER BY t.student_id, t.created_at
+    """
+    )
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        start = len(ids)
+        raw = b"".join(bytes(row[2]) for row in rows)
+        matrix[start : start + len(rows)] = np.frombuffer(
+            raw, dtype=EMBEDDING_DTYPE
+        ).reshape(len(rows), EMBEDDING_DIM)
+        ids.extend(str(row[0]) for row in rows)
+        names.extend(row[1] for row in rows)
+
+    cur.close()
+    conn.close()
+    print(f"Loaded {len(ids)} templates of {len(set(ids))} students from database")
+    return ids, names, matrix, high_water_mark
+
+
+def _group_templates(rows):
+    """
+    Fold (student_id, name, embedding_f32) rows into student dicts
+
+    Returns:
+        (students, missing_ids): students with an (n, dim) 'embedding'
+        stack, and ids whose rows had no student or template
+    """
+    students = {}
+    missing_ids = []
+    for student_id, name, raw in rows:
+        if raw is None:
+            missing_ids.append(str(student_id))
+            continue
+        student = students.setdefault(
+            str(student_id), {"id": str(student_id), "name": name, "templates": []}
+        )
+        student["templates"].append(np.frombuffer(raw, dtype=EMBEDDING_DTYPE))
+
+    for student in students.values():
+        student["embedding"] = np.vstack(student.pop("templates"))
+    return list(students.values()), missing_ids
+
+
+def load_student(student_id):
+    """
+    Load one student with all of their templates
+
+    Returns:
+        Dict with 'id', 'name' and an (n, dim) 'embedding' stack, or None if
+        the student does not exist or has no templates
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT s.id, s.name, t.embedding_f32
+        FROM students s
+        JOIN student_templates t ON t.student_id = s.id
+        WHERE s.id = %s AND t.embedding_f32 IS NOT NULL
+        ORDER BY t.created_at
+    """,
+        (str(student_id),),
+    )
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+
+    students, _ = _group_templates(rows)
+    return students[0] if students else None
+
+
+def fetch_high_water_mark() -> int:
+    """Latest gallery_changes sequence number"""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(seq), 0) FROM gallery_changes")
+    high_water_mark = cur.fetchone()[0]
+    cur.close()
+    conn.close()
+    return high_water_mark
+
+
+def load_gallery_changes(since: int):
+    """
+    Net gallery changes after a high-water mark
+
+    Returns:
+        (added, removed_ids, high_water_mark) where added holds students
+        (id, name, template stack) whose row or templates changed since then
+    """
+    conn = get_db_connection()
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(seq), 0) FROM gallery_changes")
+    high_water_mark = cur.fetchone()[0]
+    cur.execute(
+        """
+        SELECT c.student_id, s.name, t.embedding_f32
+        FROM (
+            SELECT DISTINCT student_id FROM gallery_changes
+            WHERE seq > %s AND seq <= %s
+        ) c
+        LEFT JOIN students s ON s.id = c.student_id
+        LEFT JOIN student_templates t
+            ON t.student_id = s.id AND t.embedding_f32 IS NOT NULL
+        ORDER BY c.student_id, t.created_at
+    """,
+        (since, high_water_mark),
+    )
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+
+    added, removed_ids = _group_templates(rows)
+    return added, removed_ids, high_water_mark
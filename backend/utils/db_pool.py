@@ -0,0 +1,256 @@
+"""
+Shared Postgres connection pool for the API process
+Built on psycopg2.pool.ThreadedConnectionPool. Handlers keep the
+get_db_connection() / conn.close() pattern: close() hands the connection
+back to the pool instead of tearing down the TCP connection and
+authentication.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+import psycopg2.extensions
+from fastapi import HTTPException
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+
+class PoolTimeoutError(HTTPException):
+    """
+    No pooled connection became free within the acquire timeout
+
+    An HTTPException (503), so FastAPI answers it without per-handler
+    code; handlers that catch Exception re-raise HTTPException first.
+    """
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=503, detail=detail)
+
+
+class PooledConnection:
+    """
+    A pooled psycopg2 connection whose close() returns it to the pool
+
+    Everything else (cursor, commit, autocommit, set_session, ...) goes
+    to the underlying connection, so it drops into existing code and
+    pandas.read_sql. A wrapper that is garbage collected without close()
+    is returned too, so an early return cannot leak a pool slot.
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+
+    def close(self):
+        conn = self._conn
+        if conn is not None:
+            object.__setattr__(self, "_conn", None)
+            self._pool.release(conn)
+
+    @property
+    def closed(self) -> int:
+        return 1 if self._conn is None else self._conn.closed
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already closed")
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections
+
+    psycopg2's ThreadedConnectionPool opens and reuses the connections.
+    It fails at once when max_size are out, so acquire() first queues for
+    one of max_size slots, waiting up to acquire_timeout seconds and then
+    raising PoolTimeoutError rather than queueing requests behind the
+    database indefinitely. Slots go to waiters in arrival order: a plain
+    semaphore lets newcomers barge past them, which starved a few
+    requests for most of a second at 64 concurrent.
+
+    The slots bound the total, so the pool's minconn is raised to
+    max_size once min_size are open; otherwise it closes connections
+    returned beyond minconn and reconnected ~5% of requests under load.
+    Released connections are rolled back and reset to default session
+    characteristics; broken ones are discarded.
+
+    Args:
+        connect_kwargs: psycopg2.connect() arguments
+        min_size: Connections opened by open()
+        max_size: Upper bound on open connections
+        acquire_timeout: Seconds to wait for a free connection
+    """
+
+    def __init__(
+        self,
+        connect_kwargs: Dict,
+        min_size: int = 2,
+        max_size: int = 20,
+        acquire_timeout: float = 5.0,
+    ):
+        self.connect_kwargs = connect_kwargs
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self._free = max_size
+        self._waiters = deque()
+        self.in_use = 0
+        self.acquired = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def open(self):
+        """Open min_size connections; if that fails they open on demand"""
+        with self._lock:
+            if self._pool is not None:
+                return
+            try:
+                self._pool = self._new_pool(self.min_size)
+            except psycopg2.OperationalError as e:
+                print(f"⚠️ DB pool warm-up failed: {e}")
+                self._pool = self._new_pool(0)
+
+    def _new_pool(self, warm: int) -> ThreadedConnectionPool:
+        """Pool with `warm` connections open that keeps all it opens later"""
+        pool = ThreadedConnectionPool(warm, self.max_size, **self.connect_kwargs)
+        pool.minconn = self.max_size
+        return pool
+
+    def close(self):
+        """Close every connection; in-use ones are dropped on release"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.closeall()
+
+    def acquire(self) -> PooledConnection:
+        """
+        Take a connection, opening one if none is idle
+
+        Raises: PoolTimeoutError if none is free within acquire_timeout
+        """
+        started = time.perf_counter()
+        waited = not self._take_slot()
+
+        try:
+            conn = self._getconn()
+        except Exception:
+            self._release_slot()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+            self.acquired += 1
+            if waited:
+                wait_ms = (time.perf_counter() - started) * 1000
+                self.wait_ms_total += wait_ms
+                self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        return PooledConnection(self, conn)
+
+    def _take_slot(self) -> bool:
+        """Reserve one of max_size slots; False if it had to wait"""
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return True
+            handoff = threading.Event()
+            self._waiters.append(handoff)
+            self.waits += 1
+
+        if handoff.wait(self.acquire_timeout):
+            return False
+        with self._lock:
+            if handoff.is_set():
+                # Handed a slot just as the wait timed out
+                return False
+            self._waiters.remove(handoff)
+            self.timeouts += 1
+            self.wait_ms_total += self.acquire_timeout * 1000
+        raise PoolTimeoutError(
+            f"No database connection free after {self.acquire_timeout}s"
+            f" ({self.max_size} in use)"
+        )
+
+    def _release_slot(self):
+        """Pass the slot to the longest waiter, or free it"""
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._free += 1
+
+    def _getconn(self):
+        """An open connection from the pool, skipping idle ones that died"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._new_pool(0)
+            pool = self._pool
+        while True:
+            conn = pool.getconn()
+            if not conn.closed:
+                return conn
+            pool.putconn(conn, close=True)
+            with self._lock:
+                self.discarded += 1
+
+    def release(self, conn):
+        """Reset a connection and put it back, or drop it if unusable"""
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                status = conn.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn.autocommit = False
+                conn.set_session(
+                    isolation_level="DEFAULT", readonly="DEFAULT", deferrable="DEFAULT"
+                )
+            except Exception:
+                broken = True
+
+        with self._lock:
+            pool = self._pool
+            self.in_use -= 1
+            if broken:
+                self.discarded += 1
+        try:
+            if pool is None:
+                raise PoolError("connection pool is closed")
+            pool.putconn(conn, close=broken)
+        except PoolError:
+            # The pool was closed (or replaced) while this was out
+            conn.close()
+        finally:
+            self._release_slot()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+                "avg_wait_ms": round(self.wait_ms_total / self.waits, 2)
+                if self.waits
+                else 0.0,
+                "max_wait_ms": round(self.wait_ms_max, 2),
+            }
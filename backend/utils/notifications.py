@@ -0,0 +1,136 @@
+"""
+Postgres LISTEN/NOTIFY fan-out between uvicorn workers
+Writers queue a notification inside their transaction; every worker's
+listener thread receives it once the transaction commits
+"""
+
+import json
+import os
+import select
+import socket
+import threading
+from typing import Callable, Dict, List
+
+import psycopg2.extensions
+
+# Identifies this process so a worker can skip its own notifications
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def notify(cur, channel: str, payload: Dict):
+    """Queue a JSON notification on the cursor's transaction"""
+    cur.execute(
+        "SELECT pg_notify(%s, %s)",
+        (channel, json.dumps({**payload, "origin": WORKER_ID})),
+    )
+
+
+class NotificationListener:
+    """
+    Background thread holding one LISTEN connection
+
+    Handlers get the decoded payload of every notification sent by other
+    workers. If the connection drops, notifications may have been missed,
+    so resync callbacks run after each reconnect.
+    """
+
+    def __init__(
+        self,
+        connection_factory,
+        poll_timeout: float = 1.0,
+        retry_seconds: float = 5.0,
+    ):
+        self.connection_factory = connection_factory
+        self.poll_timeout = poll_timeout
+        self.retry_seconds = retry_seconds
+        self._handlers: Dict[str, List[Callable[[Dict], None]]] = {}
+        self._resync_callbacks: List[Callable[[], None]] = []
+        self._stop = threading.Event()
+        self._listening = threading.Event()
+        self._thread = None
+
+    def subscribe(self, channel: str, handler: Callable[[Dict], None]):
+        """Register a handler for a channel (before start)"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_resync(self, callback: Callable[[], None]):
+        """Register a callback for after a reconnect"""
+        self._resync_callbacks.append(callback)
+
+    def start(self, wait_seconds: float = 5.0) -> bool:
+        """
+        Start listening in a daemon thread
+
+        Returns:
+            True once LISTEN is active, False if it timed out
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="pg-notify-listener", daemon=True
+            )
+            self._thread.start()
+        return self._listening.wait(wait_seconds)
+
+    def stop(self):
+        """Stop the listener thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_timeout + 1)
+            self._thread = None
+
+    def _run(self):
+        connected_before = False
+
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self.connection_factory()
+                conn.set_isolation_level(
+                    psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT
+                )
+                cur = conn.cursor()
+                for channel in self._handlers:
+                    cur.execute(f'LISTEN "{channel}"')
+                cur.close()
+                self._listening.set()
+
+                if connected_before:
+                    for callback in self._resync_callbacks:
+                        callback()
+                connected_before = True
+
+                while not self._stop.is_set():
+                    readable, _, _ = select.select([conn], [], [], self.poll_timeout)
+                    if not readable:
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0))
+
+            except Exception as e:
+                print(f"❌ Notification listener error: {e}")
+                self._stop.wait(self.retry_seconds)
+            finally:
+                self._listening.clear()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _dispatch(self, notification):
+        try:
+            payload = json.loads(notification.payload)
+        except ValueError:
+            print(f"❌ Bad notification payload on {notification.channel}")
+            return
+
+        if payload.get("origin") == WORKER_ID:
+            return
+
+        for handler in self._handlers.get(notification.channel, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f"❌ Notification handler error ({notification.channel}): {e}")
@@ -36,10 +36,12 @@ def log_attendance(student_id, student_name, conn):
         already_logged = cur.fetchone()
 
         if not already_logged:
-            cur.execute(
-                "INSERT INTO attendance_logs (student_id, status) VALUES (%s, %s)",
-                (student_id, 'Present')
-            )
+            # One row per student per day (backend migration 007)
+            cur.execute("""
+                INSERT INTO attendance_logs (student_id, status) VALUES (%s, %s)
+                ON CONFLICT (student_id, log_date)
+                DO UPDATE SET log_time = EXCLUDED.log_time;
+            """, (student_id, 'Present'))
             conn.commit()
             print(f">>> ATTENDANCE RECORDED: {student_name} at {datetime.now().strftime('%H:%M:%S')}")
         
@@ -72,12 +74,13 @@ def recognize_face():
                 cur = conn.cursor()
                 
                 # 1 - (embedding <=> %s) calculates Cosine Similarity
+                # Ordering by the distance itself lets the HNSW index serve it
                 cur.execute("""
                     SELECT id, name, 1 - (embedding <=> %s::vector) AS similarity 
                     FROM students 
-                    ORDER BY similarity DESC 
+                    ORDER BY embedding <=> %s::vector 
                     LIMIT 1;
-                """, (embedding,))
+                """, (embedding, embedding))
                 
                 result = cur.fetchone()
                 cur.close()
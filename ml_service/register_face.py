@@ -50,6 +50,12 @@ def init_storage():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     """)
+    # HNSW index for cosine search (embedding <=> query)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_students_embedding_hnsw
+        ON students USING hnsw (embedding vector_cosine_ops)
+        WITH (m = 16, ef_construction = 64);
+    """)
     conn.commit()
     cur.close()
     conn.close()